@@ -1,3 +1,11 @@
 from montecarlo.montecarlo import Die
+from montecarlo.montecarlo import MarkovDie
 from montecarlo.montecarlo import Game
-from montecarlo.montecarlo import Analyzer
\ No newline at end of file
+from montecarlo.montecarlo import Analyzer
+from montecarlo.montecarlo import Tally
+from montecarlo.montecarlo import Sketch
+from montecarlo.montecarlo import WordList
+from montecarlo.montecarlo import PlayCache
+from montecarlo.montecarlo import Profiler
+from montecarlo.montecarlo import spawn_generators
+from montecarlo.montecarlo import __version__
@@ -1,8 +1,375 @@
-import pandas as pd
 import numpy as np
-        
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+from functools import wraps
+
+
+__version__ = '1.0.0'
+
+
+def _cumulative_weights(weights):
+    '''
+    Turns a vector of face weights into a normalized cumulative distribution.
+    The last entry is pinned to exactly 1 so every uniform draw in [0, 1) maps to a face.
+    ---
+    inputs:
+    weights:    array-like of non-negative weights, one per face.
+    outputs:
+    cdf:    NumPy array of cumulative probabilities, one per face.
+    '''
+    weights = np.asarray(weights, dtype=float)
+    if (weights < 0).any():
+        raise ValueError("The weights must not be negative")
+    cdf = np.cumsum(weights)
+    if not cdf[-1] > 0:
+        raise ValueError("At least one face must have a positive weight")
+    cdf /= cdf[-1]
+    cdf[-1] = 1.0
+    return cdf
+
+
+def _sample_indices(cdf, u):
+    '''
+    Maps uniform draws onto face indices using the inverse of a cumulative distribution.
+    Faces with a weight of 0 can never be returned.
+    ---
+    inputs:
+    cdf:    cumulative distribution from _cumulative_weights.
+    u:      NumPy array of uniform draws in [0, 1). Any shape is accepted.
+    outputs:
+    indices:    NumPy array with the same shape as u holding the index of the face drawn.
+    '''
+    return np.searchsorted(cdf, u, side='right')
+
+
+def _alias_table(cdf):
+    '''
+    Builds a Walker/Vose alias table from a cumulative distribution in O(n) time.
+    Each face index i keeps the probability of staying on i and the alias face used otherwise.
+    ---
+    inputs:
+    cdf:    cumulative distribution from _cumulative_weights.
+    outputs:
+    prob:   NumPy array with the probability of keeping each index.
+    alias:  NumPy array with the index used when the index is not kept.
+    '''
+    n = len(cdf)
+    scaled = np.diff(cdf, prepend=0.0) * n
+    prob = np.ones(n)
+    alias = np.arange(n)
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] = (scaled[l] + scaled[s]) - 1.0
+        if scaled[l] < 1.0:
+            small.append(l)
+        else:
+            large.append(l)
+    return prob, alias
+
+
+def _sample_alias(prob, alias, u):
+    '''
+    Maps uniform draws onto face indices with an alias table in O(1) per draw.
+    A single uniform draw picks both the column (integer part) and the coin flip (fractional part).
+    ---
+    inputs:
+    prob:   probabilities from _alias_table.
+    alias:  aliases from _alias_table.
+    u:      NumPy array of uniform draws in [0, 1). Any shape is accepted.
+    outputs:
+    indices:    NumPy array with the same shape as u holding the index of the face drawn.
+    '''
+    scaled = u * len(prob)
+    indices = np.minimum(scaled.astype(np.intp), len(prob) - 1)
+    return np.where(scaled - indices < prob[indices], indices, alias[indices])
+
+
+def _code_dtype(n_faces):
+    '''
+    Picks the smallest unsigned integer dtype that can hold a code for each of n_faces faces.
+    ---
+    inputs:
+    n_faces:    Integer, the number of distinct faces.
+    outputs:
+    dtype:  NumPy dtype (uint8, uint16 or uint32).
+    '''
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n_faces <= np.iinfo(dtype).max + 1:
+            return np.dtype(dtype)
+    raise ValueError("A game can have at most 2**32 distinct faces")
+
+
+def _row_keys(codes, n_faces):
+    '''
+    Encodes each row of a face-code matrix as one integer, reading the row as a number in base n_faces.
+    Falls back to one raw byte string per row when the keys would not fit in 64 bits.
+    ---
+    inputs:
+    codes:      NumPy array of face codes with one row per roll.
+    n_faces:    Integer, the number of faces the codes refer to.
+    outputs:
+    keys:   NumPy array with one key per row. Equal rows have equal keys.
+    '''
+    if n_faces ** codes.shape[1] > np.iinfo(np.int64).max:
+        codes = np.ascontiguousarray(codes)
+        return codes.view(np.dtype((np.void, codes.dtype.itemsize * codes.shape[1]))).ravel()
+    keys = np.zeros(len(codes), dtype=np.int64)
+    for k in range(codes.shape[1]):
+        keys = keys * n_faces + codes[:, k]
+    return keys
+
+
+def _unique_rows(codes, n_faces, offset=0):
+    '''
+    Finds the distinct rows of a face-code matrix with their counts and the roll where each first appears.
+    ---
+    inputs:
+    codes:      NumPy array of face codes with one row per roll.
+    n_faces:    Integer, the number of faces the codes refer to.
+    offset:     Integer, roll number of the first row of codes. Defaults to 0.
+    outputs:
+    unique: tuple of NumPy arrays (keys, first, counts, rows), one entry per distinct row, sorted by key.
+    '''
+    keys, first, counts = np.unique(_row_keys(codes, n_faces), return_index=True, return_counts=True)
+    return keys, first + offset, counts.astype(np.int64), codes[first]
+
+
+def _merge_rows(left, right):
+    '''
+    Combines two results of _unique_rows into one, adding the counts of rows found in both.
+    ---
+    inputs:
+    left:   tuple (keys, first, counts, rows) from _unique_rows, or None.
+    right:  tuple (keys, first, counts, rows) from _unique_rows.
+    outputs:
+    unique: tuple (keys, first, counts, rows) covering the rolls of both inputs.
+    '''
+    if left is None:
+        return right
+    keys, first, counts, rows = (np.concatenate([a, b]) for a, b in zip(left, right))
+    keys, index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    merged_counts = np.zeros(len(keys), dtype=np.int64)
+    np.add.at(merged_counts, inverse, counts)
+    merged_first = np.full(len(keys), np.iinfo(np.int64).max)
+    np.minimum.at(merged_first, inverse, first)
+    return keys, merged_first, merged_counts, rows[index]
+
+
+def _order_rows(unique):
+    '''
+    Orders distinct rows like pandas value_counts: by count from most to least, with ties in order of first appearance.
+    ---
+    inputs:
+    unique: tuple (keys, first, counts, rows) from _unique_rows or _merge_rows.
+    outputs:
+    rows:   NumPy array with one distinct row of codes per line.
+    counts: NumPy array with the number of times each distinct row appears.
+    '''
+    _, first, counts, rows = unique
+    order = np.lexsort((first, -counts))
+    return rows[order], counts[order]
+
+
+def _count_rows(codes, n_faces):
+    '''
+    Counts the distinct rows of a face-code matrix in value_counts order.
+    ---
+    inputs:
+    codes:      NumPy array of face codes with one row per roll.
+    n_faces:    Integer, the number of faces the codes refer to.
+    outputs:
+    rows:   NumPy array with one distinct row of codes per line.
+    counts: NumPy array with the number of times each distinct row appears.
+    '''
+    return _order_rows(_unique_rows(codes, n_faces))
+
+
+def _label_rows(faces, rows, counts, name='count'):
+    '''
+    Builds a data frame with a MultiIndex of faces from distinct rows of face codes and their counts.
+    ---
+    inputs:
+    faces:  NumPy array of faces, where faces[code] is the face for a code.
+    rows:   NumPy array with one distinct row of codes per line.
+    counts: NumPy array of counts (or probabilities) for each row.
+    name:   String, the name of the column. Defaults to 'count', in which case the values are stored as integers.
+    outputs:
+    count_df: Data frame with a MultiIndex of faces and a single column.
+    '''
+    import pandas as pd
+    index = pd.MultiIndex.from_arrays([faces[rows[:, k]] for k in range(rows.shape[1])])
+    count_df = pd.DataFrame({name: counts.astype(np.int64) if name == 'count' else counts}, index=index)
+    return count_df
+
+
+def _exact_rows(probs, order_free, max_outcomes):
+    '''
+    Computes the exact probability of every roll (or every combination) from the face probabilities of each die.
+    The dice are added one at a time, so combinations are merged as they are built instead of listing every permutation.
+    ---
+    inputs:
+    probs:      NumPy array with one row per die and one column per face code holding the probability of the face.
+    order_free: Boolean. If True rows are sorted, giving combinations; if False they are permutations.
+    max_outcomes:   Integer, the largest number of outcomes allowed at any step. A ValueError is raised above it.
+    outputs:
+    rows:   NumPy array with one possible row of face codes per line.
+    row_probs: NumPy array with the probability of each row.
+    '''
+    n_faces = probs.shape[1]
+    rows = np.zeros((1, 0), dtype=np.int64)
+    row_probs = np.ones(1)
+    for die_probs in probs:
+        support = np.flatnonzero(die_probs)
+        if len(rows) * len(support) > max_outcomes:
+            raise ValueError(f"There are more than {max_outcomes} outcomes. Please raise max_outcomes or simulate instead.")
+        rows = np.hstack([np.repeat(rows, len(support), axis=0), np.tile(support, len(rows))[:, None]])
+        row_probs = np.repeat(row_probs, len(support)) * np.tile(die_probs[support], len(row_probs))
+        if order_free:
+            rows = np.sort(rows, axis=1)
+            _, first, inverse = np.unique(_row_keys(rows, n_faces), return_index=True, return_inverse=True)
+            row_probs = np.bincount(inverse, weights=row_probs)
+            rows = rows[first]
+    order = np.argsort(-row_probs, kind='stable')
+    return rows[order], row_probs[order]
+
+
+def _wilson_interval(hits, n, z):
+    '''
+    Computes the Wilson score interval of a proportion, which stays sensible when there are few or no hits.
+    ---
+    inputs:
+    hits:   Integer, the number of rolls where the event happened.
+    n:      Integer, the number of rolls.
+    z:      Float, the normal quantile of the confidence level.
+    outputs:
+    ci_low:     Float, the lower end of the interval.
+    ci_high:    Float, the upper end of the interval.
+    '''
+    p = hits / n
+    center = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+    half = z * (p * (1 - p) / n + z ** 2 / (4 * n ** 2)) ** 0.5 / (1 + z ** 2 / n)
+    return max(center - half, 0.0), min(center + half, 1.0)
+
+
+# Odd 64-bit constants for hashing rows of face codes, from the splitmix64 generator.
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix64(h):
+    '''
+    Scrambles an array of unsigned 64-bit integers with the splitmix64 finalizer, which is one-to-one.
+    '''
+    with np.errstate(over='ignore'):
+        h = (h ^ (h >> np.uint64(30))) * _MIX1
+        h = (h ^ (h >> np.uint64(27))) * _MIX2
+    return h ^ (h >> np.uint64(31))
+
+
+def _row_hashes(rows):
+    '''
+    Hashes each row of a face-code matrix to an unsigned 64-bit integer. Unlike _row_keys it works for any number of
+    dice and faces, but different rows can (very rarely) share a hash.
+    ---
+    inputs:
+    rows:   NumPy array of face codes with one row per roll.
+    outputs:
+    hashes: NumPy array of np.uint64 with one hash per row.
+    '''
+    hashes = np.full(len(rows), _GOLDEN, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for k in range(rows.shape[1]):
+            hashes = _mix64(hashes + _GOLDEN + rows[:, k].astype(np.uint64))
+    return hashes
+
+
+def _bit_length(x):
+    '''
+    Returns the number of bits needed to write each unsigned 64-bit integer, computed exactly from its two 32-bit halves.
+    '''
+    high = (x >> np.uint64(32)).astype(np.float64)
+    low = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+# Number of rolls the Analyzer reads at a time, which bounds its memory use on memory mapped files.
+_SLICE_ROWS = 1000000
+
+
+# Below this many faces a binary search over the cumulative distribution is as fast as the alias method.
+_ALIAS_MIN_FACES = 32
+
+
+def _get_rng(seed=None):
+    '''
+    Returns a NumPy random Generator for a seed.
+    A Generator that is passed in is used as is, so its stream continues where it left off.
+    ---
+    inputs:
+    seed:   None, an integer, a SeedSequence or a NumPy Generator.
+            None draws fresh entropy from the operating system.
+    outputs:
+    rng: NumPy Generator.
+    '''
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def spawn_generators(seed, n):
+    '''
+    Creates n independent, reproducible random Generators from one seed using SeedSequence.spawn.
+    Each generator can be handed to a separate worker or shard without the streams being correlated,
+    and the same seed always produces the same n streams.
+    ---
+    inputs:
+    seed:   None, an integer, a SeedSequence or a NumPy Generator.
+            A Generator spawns children from its own seed sequence.
+    n:      Integer, the number of generators to create.
+    outputs:
+    generators: python list of n NumPy Generators.
+    '''
+    if isinstance(seed, np.random.Generator):
+        return seed.spawn(n)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed.spawn(n)]
+
+
+# The Profiler that is recording, if any. Profiled methods look it up once per call, so they cost almost nothing without one.
+_PROFILER = None
+
+
+def _profiled(stage, rows):
+    '''
+    Decorator that records a call of a method as a stage of the active Profiler. Without an active Profiler the method is called directly.
+    ---
+    inputs:
+    stage:  String, the name of the stage, such as "Game.play".
+    rows:   Function called with the result followed by the arguments of the method, returning the number of rows processed.
+    outputs:
+    wrap: decorator.
+    '''
+    def wrap(method):
+        @wraps(method)
+        def profiled(*args, **kwargs):
+            profiler = _PROFILER
+            if profiler is None:
+                return method(*args, **kwargs)
+            return profiler._record(stage, rows, method, args, kwargs)
+        return profiled
+    return wrap
+
 
-        
 class Die:
 
     '''
@@ -15,10 +382,13 @@ class Die:
                 The user must input a numpy array with faced for the die.
     
     change_weight: Changes the weight of one face of the die.
+
+    set_weights: Changes the weights of many faces of the die at once.
         
 
     roll_die:   Rolls the die a given number of times.
                 The results for roll_die will change as if the weights for the die are changed.
+                Rolls are drawn with either an inverse-CDF or an alias-table sampler, see the sampler attribute.
     
     
     get_current_state: Prints a data frame with the sides of the die as an index and the assigned weights for each side as the data.
@@ -26,41 +396,52 @@ class Die:
     ---
     Attributes: 
     faces: NumPy array of the faces for a die.
+    sampler: "auto", "cdf" or "alias". 
+             "cdf" searches the cumulative distribution of the weights for each draw.
+             "alias" builds an alias table once and then draws in constant time, which is faster for dice with many faces.
+             "auto" uses the alias table when the die has many faces and enough rolls are drawn to pay for building it.
  
     '''
 
-    def __init__(self, N):
+    def __init__(self, N, seed=None, sampler="auto"):
         '''
         Initializer. 
         It sets up the die with a given number of sides and adds a weight of 1 for each side of the die.
-        A private dataframe is also created. 
-        The private dataframe has the sides of the die as an index and the weights as the data in a column.
+        The weights are kept in a private NumPy array in the same order as the faces.
+        The data frame of the sides and weights is only created when get_current_state is called.
 
         ---
         inputs:
         N:  Faces for a die.  
             N must be a NumPy array with unique values. 
             This method will return errors if those conditions are not met.
+        seed:   Optional integer, SeedSequence or NumPy Generator used for the rolls of this die.
+                Two dice created with the same seed roll the same results.
+        sampler:    "auto", "cdf" or "alias". Defaults to "auto".
+                    An error will be raised for any other value.
         outputs:None
         
         '''
         
         if not isinstance (N, np.ndarray):
             raise TypeError("The N sides must be a NumPy array")
+        if sampler not in ("auto", "cdf", "alias"):
+            raise ValueError(f"{sampler} is not an acceptable sampler. Please enter 'auto', 'cdf' or 'alias'")
         if len(N) != len(np.unique(N)):
             raise ValueError("The faces must be unique values")
         else:
             self.faces = N
-        weights = [1 for _ in range(len(self.faces))]
-        self.__die_df = pd.DataFrame({            
-            'side': [n for n in self.faces],
-            'weights': weights
-        })
-        self.__die_df_index = self.__die_df.set_index(['side'])
+        self.__weights = np.ones(len(self.faces))
+        self.__positions = {face: i for i, face in enumerate(self.faces.tolist())}
+        self.__die_df_index = None
+        self.__cdf = None
+        self.__alias = None
+        self.__rng = _get_rng(seed)
+        self.sampler = sampler
 
     def change_weight(self, face, new_weight):
         '''
-        Changes the weight of one specified side of the die by assigning the new weight to the data frame.
+        Changes the weight of one specified side of the die by assigning the new weight to the array of weights.
         ---
         inputs:
         face:   The face from your die that you want to change the weight of.
@@ -73,29 +454,116 @@ class Die:
         outputs: None
         '''
         
-        if face not in self.faces:
+        if face not in self.__positions:
             raise IndexError("The face for which the weight is altered needs to be one of the existing faces")
         if not isinstance(new_weight,(float,int)):
             raise TypeError("The new weight must be a float or integer")
         else:
-            self.__die_df_index.loc[face]= new_weight
+            self.__weights[self.__positions[face]] = new_weight
+            self._weights_changed()
+
+    def set_weights(self, weights):
+        '''
+        Changes the weights of many faces at once. Any cached sampler is only rebuilt once for the whole update.
+        ---
+        inputs:
+        weights:    Either a python dictionary of {face: new weight} for the faces to change,
+                    or an array-like of new weights for every face, in the same order as faces.
+                    Every face must be one of the existing faces and every weight must be a number.
+                    An error will be raised if those conditions are not met.
+        outputs: None
+        '''
+        self.__weights = self._updated_weights(weights)
+        self._weights_changed()
+
+    def _updated_weights(self, weights):
+        '''
+        Returns a copy of the weights with the changes of set_weights applied, without changing the die.
+        ---
+        inputs:
+        weights:    A python dictionary of {face: new weight}, or an array-like of new weights for every face.
+        outputs:
+        new_weights: NumPy array of weights in the same order as faces.
+        '''
+        new_weights = self.__weights.copy()
+        if isinstance(weights, dict):
+            missing = [face for face in weights if face not in self.__positions]
+            if missing:
+                raise IndexError(f"The faces {missing} are not existing faces")
+            positions = [self.__positions[face] for face in weights]
+            values = np.asarray(list(weights.values()))
+        else:
+            positions = slice(None)
+            values = np.asarray(weights)
+            if values.shape != self.__weights.shape:
+                raise ValueError(f"Expected {len(self.__weights)} weights, one for each face")
+        if values.dtype.kind not in "biuf":
+            raise TypeError("The new weights must be floats or integers")
+        new_weights[positions] = values
+        return new_weights
+
+    def _weights_changed(self):
+        '''
+        Drops the samplers built from the old weights and updates the data frame from get_current_state, if it has been built.
+        '''
+        self.__cdf = None
+        self.__alias = None
+        if self.__die_df_index is not None:
+            self.__die_df_index['weights'] = self.__weights.copy()
+
+    def _cdf(self):
+        '''
+        Returns the cumulative distribution of the current weights.
+        The distribution is computed once and reused until a weight is changed.
+        ---
+        inputs: none
+        outputs:
+        cdf: NumPy array of cumulative probabilities in the same order as faces.
+        '''
+        if self.__cdf is None:
+            self.__cdf = _cumulative_weights(self.__weights)
+        return self.__cdf
+
+    def _draw(self, u, batch=None):
+        '''
+        Maps uniform draws onto face indices with the sampler chosen by the sampler attribute.
+        The alias table is only built the first time it is needed after a weight change.
+        ---
+        inputs:
+        u:  NumPy array of uniform draws in [0, 1). Any shape is accepted.
+        batch:  Optional integer, the total number of draws u is part of. Defaults to the size of u.
+                The "auto" sampler is chosen from the batch, so drawing a play in chunks gives the same results as drawing it at once.
+        outputs:
+        indices: NumPy array with the same shape as u holding the index of the face drawn.
+        '''
+        use_alias = self.sampler == "alias"
+        if self.sampler == "auto":
+            batch = u.size if batch is None else batch
+            use_alias = len(self.faces) >= _ALIAS_MIN_FACES and batch >= len(self.faces)
+        if not use_alias:
+            return _sample_indices(self._cdf(), u)
+        if self.__alias is None:
+            self.__alias = _alias_table(self._cdf())
+        return _sample_alias(*self.__alias, u)
 
-    def roll_dice(self, nrolls=1):
+    @_profiled("Die.roll_dice", lambda results, *args, **kwargs: len(results))
+    def roll_dice(self, nrolls=1, seed=None):
         '''
         Takes a sample of the sides using the assigned weights, and prints the results of the rolls as a list.
+        All of the rolls are drawn at once from the cumulative distribution of the weights.
         ---
         inputs:
         nrolls: Default set to one unless the user reassigns it. 
                 Nrolls should be an integer.
+        seed:   Optional integer, SeedSequence or NumPy Generator used for these rolls only.
+                Defaults to the random stream of the die.
         outputs:
         results: a python list of the results of the rolls
         '''
         
-        results = []
-        weight = self.__die_df['weights']
-        for i in range(nrolls):
-            result = self.__die_df.side.sample(weights=weight).values[0].tolist()
-            results.append(result)
+        rng = self.__rng if seed is None else _get_rng(seed)
+        indices = self._draw(rng.random(nrolls))
+        results = self.faces[indices].tolist()
         return results
     
     def get_current_state(self):
@@ -105,17 +573,367 @@ class Die:
         inputs: none
         outputs:
         die_df_index: data frame with the faces of the die as an index and a single column with the assigned weights for each face.
+                      The same data frame is returned on every call and is kept up to date as the weights change.
         '''
-        
+        if self.__die_df_index is None:
+            import pandas as pd
+            self.__die_df_index = pd.DataFrame({'weights': self.__weights.copy()}, index=pd.Index(self.faces, name='side'))
         return self.__die_df_index
-    
 
-    
-    
+    def __getstate__(self):
+        '''
+        Leaves the data frame of get_current_state out when a die is pickled, such as when it is sent to a worker process,
+        so the worker does not have to import pandas. It is built again when it is used.
+        '''
+        state = self.__dict__.copy()
+        state['_Die__die_df_index'] = None
+        return state
+
+# Largest number of next-state entries MarkovDie._draw builds at a time, which bounds its memory use.
+_CHAIN_BLOCK = 2 ** 20
+
+# Most faces a MarkovDie can have for _draw to use its scan. The scan costs about one searchsorted per face per roll, and
+# measured against a loop over the rolls (200000 rolls of 5 chains) it was faster up to 6 faces and slower from 8 on.
+_CHAIN_SCAN_MAX_FACES = 6
+
+
+class MarkovDie(Die):
+    '''
+    A die whose next face depends on the face it rolled last, for sticky or loaded dice.
+    The first roll uses the weights of the die like any Die, and every later roll uses the row of a transition matrix
+    for the previous face. Each column of a Game is its own chain, and all the chains of a play are advanced at once.
+    A MarkovDie can be used in a Game with other dice, and every Analyzer method works on the results.
+    The exact methods of Game and Game.sweep assume independent rolls, so they raise a ValueError for a game with a MarkovDie.
+    Game.play also raises a ValueError for workers greater than 1, since each worker would start its chains again.
+    ---
+    Methods:
+    __init__:   Initializer. It takes the faces of the die and an optional transition matrix.
+
+    set_transitions:    Changes the transition matrix.
+
+    get_transitions:    Returns a data frame of the transition probabilities.
+
+    All the methods of Die. The weights set the distribution of the first roll.
+    ---
+    Attributes:
+    faces: NumPy array of the faces for a die.
+    '''
+    def __init__(self, N, transitions=None, seed=None):
+        '''
+        Initializer for the MarkovDie class.
+        ---
+        inputs:
+        N:  Faces for a die. N must be a NumPy array with unique values.
+        transitions:    Optional array-like with one row and one column per face. Row i holds the weights of the next face
+                        after face i was rolled, and is normalized like the weights of a Die.
+                        Defaults to equal weights, which rolls like an ordinary fair die.
+        seed:   Optional integer, SeedSequence or NumPy Generator used for the rolls of this die.
+        outputs: none
+        '''
+        super().__init__(N, seed=seed, sampler="cdf")
+        self.__transitions = np.ones((len(self.faces), len(self.faces)))
+        self.__transition_cdfs = None
+        if transitions is not None:
+            self.set_transitions(transitions)
+
+    def set_transitions(self, transitions):
+        '''
+        Changes the transition matrix of the die.
+        ---
+        inputs:
+        transitions:    Array-like with one row and one column per face, in the order of faces.
+                        Every weight must be a number that is not negative, and every row must have a positive weight.
+                        An error will be raised if those conditions are not met.
+        outputs: none
+        '''
+        transitions = np.asarray(transitions)
+        if transitions.shape != self.__transitions.shape:
+            raise ValueError(f"Expected a {len(self.faces)} by {len(self.faces)} transition matrix, one row and column for each face")
+        if transitions.dtype.kind not in "biuf":
+            raise TypeError("The transition weights must be floats or integers")
+        if (transitions < 0).any():
+            raise ValueError("The transition weights must not be negative")
+        if not (transitions.sum(axis=1) > 0).all():
+            raise ValueError("Every row of the transitions must have a positive weight")
+        self.__transitions = transitions.astype(float)
+        self.__transition_cdfs = None
+
+    def get_transitions(self):
+        '''
+        Returns the probability of each next face after each face.
+        ---
+        inputs: none
+        outputs:
+        transition_df:  Data frame with the previous face as the index and the next face as the columns.
+                        Each row sums to 1.
+        '''
+        import pandas as pd
+        probs = self.__transitions / self.__transitions.sum(axis=1, keepdims=True)
+        transition_df = pd.DataFrame(probs, index=pd.Index(self.faces, name='side'), columns=self.faces)
+        return transition_df
+
+    def _transition_cdfs(self):
+        '''
+        Returns the cumulative distribution of each row of the transition matrix, computed once until it is changed.
+        '''
+        if self.__transition_cdfs is None:
+            self.__transition_cdfs = np.array([_cumulative_weights(row) for row in self.__transitions])
+        return self.__transition_cdfs
+
+    def _draw(self, u, batch=None, start=None):
+        '''
+        Maps uniform draws onto face indices, one chain per column of u.
+        Dice with at most _CHAIN_SCAN_MAX_FACES faces use a scan: each draw gives the next face of every possible previous
+        face, and these one-step maps are composed with a doubling (prefix) scan, so the rolls of a block of steps are found
+        with a few NumPy operations. The blocks hold at most _CHAIN_BLOCK entries and each starts where the last one ended.
+        Larger dice step through the rolls with _walk, which does one searchsorted per roll for all of the chains at once.
+        ---
+        inputs:
+        u:  NumPy array of uniform draws in [0, 1) with one row per roll. Each column is a chain; a 1-D array is one chain.
+        batch:  Optional integer, the total number of draws u is part of. Only used for the first roll.
+        start:  Optional NumPy array with the index of the last face of each chain, to continue chains from an earlier chunk.
+                Defaults to None, in which case the first roll of each chain is drawn from the weights of the die.
+        outputs:
+        indices: NumPy array with the same shape as u holding the index of the face drawn.
+        '''
+        chains = u.reshape(len(u), -1)
+        states = np.empty(chains.shape, dtype=np.intp)
+        if len(chains) == 0:
+            return states.reshape(u.shape)
+        if start is None:
+            current = super()._draw(chains[0], batch)
+            states[0] = current
+            first = 1
+        else:
+            current = np.asarray(start, dtype=np.intp)
+            first = 0
+        cdfs = self._transition_cdfs()
+        n_faces = len(self.faces)
+        if n_faces > _CHAIN_SCAN_MAX_FACES:
+            states[first:] = self._walk(cdfs, chains[first:], current)
+            return states.reshape(u.shape)
+        block = max(1, _CHAIN_BLOCK // (n_faces * chains.shape[1]))
+        for begin in range(first, len(chains), block):
+            steps = chains[begin:begin + block]
+            maps = np.empty(steps.shape + (n_faces,), dtype=np.intp)
+            for face in range(n_faces):
+                maps[:, :, face] = np.searchsorted(cdfs[face], steps, side='right')
+            width = 1
+            while width < len(maps):
+                maps[width:] = np.take_along_axis(maps[width:], maps[:-width], axis=2)
+                width *= 2
+            current_index = np.broadcast_to(current[None, :, None], (len(maps), chains.shape[1], 1))
+            states[begin:begin + len(maps)] = np.take_along_axis(maps, current_index, axis=2)[:, :, 0]
+            current = states[begin + len(maps) - 1]
+        return states.reshape(u.shape)
+
+    def _walk(self, cdfs, steps, current):
+        '''
+        Steps the chains through the rolls one at a time, drawing the next face of every chain with a single searchsorted.
+        The rows of the transition cdfs are shifted by their face index and flattened, so previous face f plus a draw
+        lands in row f. The shift can round a draw within a few ulps of a row boundary onto the wrong face, so the
+        result is checked against the unshifted cdfs and the rare rolls that disagree are redrawn from the first one on.
+        ---
+        inputs:
+        cdfs:   NumPy array of the cumulative transition weights, one row per previous face.
+        steps:  2-D NumPy array of uniform draws in [0, 1), one row per roll and one column per chain.
+        current:    NumPy array with the index of the face each chain is on before the first roll.
+        outputs:
+        indices: NumPy array with the same shape as steps holding the index of the face drawn.
+        '''
+        n_faces = len(cdfs)
+        flat = (cdfs + np.arange(n_faces)[:, None]).ravel()
+        rows = np.arange(n_faces) * n_faces
+        cdfs = cdfs.ravel()
+        states = np.empty(steps.shape, dtype=np.intp)
+        previous = np.asarray(current, dtype=np.intp)
+        begin = 0
+        while begin < len(steps):
+            current = previous
+            for step in range(begin, len(steps)):
+                current = np.searchsorted(flat, current + steps[step], side='right') - rows[current]
+                np.minimum(current, n_faces - 1, out=current)
+                states[step] = current
+            before = rows[np.concatenate([previous[None, :], states[begin:-1]])]
+            after = states[begin:]
+            below = cdfs[before + after] > steps[begin:]
+            above = (after == 0) | (cdfs[before + np.maximum(after - 1, 0)] <= steps[begin:])
+            wrong = np.flatnonzero(~(below & above).all(axis=1))
+            if len(wrong) == 0:
+                break
+            step = begin + wrong[0]
+            previous = states[step - 1] if step > 0 else previous
+            states[step] = (cdfs.reshape(n_faces, n_faces)[previous] <= steps[step][:, None]).sum(axis=1)
+            previous = states[step]
+            begin = step + 1
+        return states
+
+
+def _roll_codes(groups, n_faces, rng, rolls, batch, states=None):
+    '''
+    Draws one chunk of rolls for every die of a game and returns them as face codes.
+    The chains of a MarkovDie continue from the last faces kept in states, which is then updated.
+    ---
+    inputs:
+    groups:     python list of (die, columns, face codes of the die) from Game._die_groups.
+    n_faces:    Integer, the number of faces of the game.
+    rng:        NumPy Generator the uniform draws are taken from.
+    rolls:      Integer, the number of rolls in this chunk.
+    batch:      Integer, the number of rolls in the whole play, used to choose the sampler of each die.
+    states:     Optional python dictionary from the position of each MarkovDie in groups to the index of the last face of
+                each of its chains. Defaults to None, which starts new chains.
+    outputs:
+    codes: NumPy array with one row per roll and one column per die.
+    '''
+    n_dice = sum(len(columns) for _, columns, _ in groups)
+    u = rng.random((rolls, n_dice))
+    codes = np.empty(u.shape, dtype=_code_dtype(n_faces))
+    for group, (die, columns, face_codes) in enumerate(groups):
+        if isinstance(die, MarkovDie):
+            indices = die._draw(u[:, columns], batch * len(columns), None if states is None else states.get(group))
+            if states is not None and rolls > 0:
+                states[group] = indices[-1]
+        else:
+            indices = die._draw(u[:, columns], batch * len(columns))
+        codes[:, columns] = face_codes[indices]
+    return codes
+
+
+def _faces_path(path):
+    '''
+    Returns the path of the file that holds the faces for an outcome file, for example plays.faces.npy for plays.npy.
+    '''
+    root, _ = os.path.splitext(os.fspath(path))
+    return root + '.faces.npy'
+
+
+def _play_rolls(groups, faces, rng, rolls, batch, chunk_size, stream, out=None, offset=0):
+    '''
+    Plays rolls chunk_size at a time, either keeping every roll or only a Tally of them.
+    This is the work done by Game.play, and by each worker process of a parallel play.
+    With out, the rolls are written into rows offset to offset + rolls of an existing .npy file through a memory map.
+    ---
+    inputs:
+    groups:     python list of (die, columns, face codes of the die) from Game._die_groups.
+    faces:      NumPy array of faces of the game.
+    rng:        NumPy Generator the uniform draws are taken from.
+    rolls:      Integer, the number of rolls to play.
+    batch:      Integer, the number of rolls in the whole play, used to choose the sampler of each die.
+    chunk_size: Integer, the number of rolls drawn at a time.
+    stream:     Boolean, or an empty Sketch. If True only a Tally of the rolls is returned. If a Sketch, the rolls are added to it
+                and it is returned.
+    out:        Optional path of a .npy file of face codes created by Game.play.
+    offset:     Integer, the first row of the file to write. Defaults to 0.
+    outputs:
+    result: NumPy array of face codes with one row per roll, a Tally or Sketch if stream is set, or None if out is given.
+    '''
+    states = {}
+    if stream is not False:
+        tally = stream if isinstance(stream, Sketch) else Tally(faces)
+        if rolls == 0:
+            tally.update(_roll_codes(groups, len(faces), rng, 0, batch, states))
+        for start in range(0, rolls, chunk_size):
+            tally.update(_roll_codes(groups, len(faces), rng, min(chunk_size, rolls - start), batch, states))
+        return tally
+    n_dice = sum(len(columns) for _, columns, _ in groups)
+    if out is None:
+        codes = np.empty((rolls, n_dice), dtype=_code_dtype(len(faces)))
+    else:
+        file_codes = np.load(out, mmap_mode='r+')
+        codes = file_codes[offset:offset + rolls]
+    for start in range(0, rolls, chunk_size):
+        codes[start:start + chunk_size] = _roll_codes(groups, len(faces), rng, min(chunk_size, rolls - start), batch, states)
+    if out is None:
+        return codes
+    file_codes.flush()
+    del file_codes
+
+
+def _roll_chunk(groups, faces, rng, rolls, batch, states, stream):
+    '''
+    Plays one chunk of rolls for Game.play_async. The chunk may be played in another process, where the changes
+    to rng and states would be lost, so both are returned for the next chunk.
+    ---
+    inputs:
+    groups:     python list of (die, columns, face codes of the die) from Game._die_groups.
+    faces:      NumPy array of faces of the game.
+    rng:        NumPy Generator the uniform draws are taken from.
+    rolls:      Integer, the number of rolls in this chunk.
+    batch:      Integer, the number of rolls in the whole play, used to choose the sampler of each die.
+    states:     python dictionary of the last faces of the chains of each MarkovDie, see _roll_codes.
+    stream:     Boolean. If True a Tally of the rolls is returned instead of the rolls.
+    outputs:
+    result: NumPy array of face codes with one row per roll, or a Tally of them if stream is True.
+    rng:    The NumPy Generator, advanced past the draws of this chunk.
+    states: The python dictionary of the last faces of the chains.
+    '''
+    result = _roll_codes(groups, len(faces), rng, rolls, batch, states)
+    if stream:
+        tally = Tally(faces)
+        tally.update(result)
+        result = tally
+    return result, rng, states
+
+
+def _wide_frame(codes, faces, categorical=False):
+    '''
+    Builds the wide data frame of a play, with one row per roll and one column per die, from its face codes.
+    ---
+    inputs:
+    codes:  NumPy array of face codes with one row per roll and one column per die.
+    faces:  NumPy array of faces, where faces[code] is the face for a code.
+    categorical:    Boolean. If True the columns are pandas Categoricals that share the face codes.
+    outputs:
+    outcome: Data frame with roll_number as the index and the die numbers as the columns.
+    '''
+    import pandas as pd
+    if categorical:
+        columns = {k: pd.Categorical.from_codes(codes[:, k], categories=faces) for k in range(codes.shape[1])}
+    else:
+        columns = {k: faces[codes[:, k]] for k in range(codes.shape[1])}
+    outcome = pd.DataFrame(columns, index=pd.RangeIndex(len(codes), name='roll_number'))
+    return outcome
+
+
+# Kinds of NumPy faces that can share one face table. Mixing kinds would silently coerce faces, such as 1 into '1' or 1.0.
+_FACE_KINDS = {'b': 'boolean', 'i': 'integer', 'u': 'integer', 'f': 'float', 'c': 'complex', 'U': 'string', 'S': 'bytes',
+               'M': 'datetime', 'm': 'timedelta', 'O': 'object'}
+
+
+def _game_faces(dice):
+    '''
+    Builds the face table of a game and maps the faces of each die into it.
+    The faces of the dice may differ in number and values, but they must be of one kind (integers, floats, strings, ...)
+    so that no face is converted into another when the tables are joined.
+    ---
+    inputs:
+    dice:   python list of Die objects.
+    outputs:
+    faces:  sorted NumPy array of every distinct face of the dice.
+    face_codes: python dictionary from the id of each die to a NumPy array with the code in faces of each face of the die.
+    '''
+    kinds = {_FACE_KINDS.get(die.faces.dtype.kind, die.faces.dtype.kind) for die in dice}
+    if len(kinds) > 1:
+        raise ValueError(f"The dice mix {' and '.join(sorted(kinds))} faces. All the dice of a game must have faces of the same kind")
+    try:
+        faces = np.unique(np.concatenate([die.faces for die in dice]))
+    except TypeError:
+        raise ValueError("The faces of the dice cannot be sorted together. All the dice of a game must have faces of the same kind")
+    face_codes = {}
+    for die in dice:
+        codes = np.searchsorted(faces, die.faces)
+        if not np.array_equal(faces[codes], die.faces):
+            raise ValueError("The faces of the dice cannot be put in one table without changing them")
+        face_codes[id(die)] = codes
+    return faces, face_codes
+
+
 class Game:
     '''
-    Gives the user the ability to roll one or more similar die. 
-    The die should have the same number of sides and associated faces.
+    Gives the user the ability to roll one or more die.
+    The die can have different numbers of sides and different faces, as long as the faces are of the same kind.
+    All the faces are kept in one sorted table, and each die is mapped into it once when the game is created,
+    so every play and every count works on one matrix of integer face codes.
     Game is initialized with a python list of one or more dice created from the die class.
     Game gives the user the ability to "roll" the inputed dice a given number of times.
     ---
@@ -123,87 +941,603 @@ class Game:
     __init__:   Initializer. It takes an input of a python list of dice.
 
     play:   The user calls this method to "roll" the die. The user is able to specify the number of rolls.
-            The die are sampled for the number of rolls specified, taking into account the given weights, and the output is stored in a private dataframe.
+            The die are sampled for the number of rolls specified, taking into account the given weights, and the output is stored in a private matrix of integer face codes.
 
     show_last_play: Method to see the results of their most recent play.
                     A dataframe of the results is returned.
+
+    show_last_codes:    Method to see the results of the most recent play as integer face codes.
+                        The code matrix and the face lookup table are returned.
+
+    iter_narrow:    Method to go through the most recent play in narrow format one chunk at a time, as NumPy columns.
+
+    write_narrow:   Method to write the most recent play to a CSV or Parquet file in narrow format, one chunk at a time.
+
+    show_last_tally:    Method to see the running counts of the most recent play as a Tally.
+                        This also works for streamed plays, where the rolls themselves are not kept.
+
+    play_async: Coroutine that plays the dice like play, one chunk at a time in an executor, so an event loop is not blocked.
+
+    play_until: Plays the dice in batches until an estimated rate is known to a target precision.
+
+    sweep:  Plays the dice under many weight configurations with common random numbers and compares the results.
+
+    expected_jackpot_rate:  Exact probability that a roll is a jackpot, computed from the weights of the dice.
+
+    expected_face_counts:   Exact expected number of times each face is rolled.
+
+    exact_combos:   Exact probability of every distinct combination.
+
+    exact_permutations: Exact probability of every distinct permutation.
+
+    show_face_codes:    Method to see the code in the faces attribute of each face of each die.
     ---
     attributes:
-    die_list: Python list of dice, where each element of the list is a single die.
+    die_list: Python list of the current state data frame of each die, see Die.get_current_state.
+              It is only built when it is used, so a game that only rolls dice never imports pandas.
+    faces: NumPy array with every face used by the dice in the game. The code of a face is its position in this array.
     '''
-    def __init__(self, dielist):
+    def __init__(self, dielist, seed=None):
         '''
         Initializer for the Game class
         ---
         inputs:
         dielist:   Python list of dice created using the Die class.
-                    The die in die list should have the same number of sides and associated faces.
-        outputs:
-        die_list: Python list of dice, where each element of the list is a single die.
+                    The dice may have different faces, but a ValueError is raised if their faces are of different kinds,
+                    such as integers and strings or integers and floats, since they would be converted into each other.
+        seed:   Optional integer, SeedSequence or NumPy Generator used for the plays of this game.
+        outputs: none
         '''
-        die_list = list(range(len(dielist)))
-        for i in range(len(dielist)):
-            die_list[i] = dielist[i].get_current_state()
-        
-        self.die_list = die_list
+        if len(dielist) == 0:
+            raise ValueError("The dielist must have at least one die")
+        if not all(isinstance(die, Die) for die in dielist):
+            raise TypeError("Every element of the dielist must be a Die object")
+        self.__dice = list(dielist)
+        self.__rng = _get_rng(seed)
+        self.faces, self.__face_codes = _game_faces(self.__dice)
+        self.__cache_entry = None
+
+    @property
+    def die_list(self):
+        '''
+        Python list of the current state data frame of each die, in the order of the dice.
+        '''
+        die_list = [die.get_current_state() for die in self.__dice]
+        return die_list
     
-    def play (self, rolls):
+    @_profiled("Game.play", lambda result, self, rolls, *args, **kwargs: rolls)
+    def play (self, rolls, seed=None, chunk_size=1000000, stream=False, workers=1, cache=None, out=None, sketch=None):
         '''
         Allows user to "roll" the die.
-        Samples the faces of the die for a given number of rolls based on the given weights and saves the result in a private dataframe.
+        Samples the faces of the die for a given number of rolls based on the given weights and saves the result in a private matrix.
+        Every roll of every die is drawn in a single batch, so the cost does not grow with a python loop over the rolls.
+        The matrix has one row per roll and one column per die and holds the code of each face in the faces attribute,
+        using the smallest unsigned integer type that fits.
+        The rolls are drawn chunk_size rows at a time. With stream=True each chunk is added to a Tally and then dropped,
+        so plays far larger than memory can be analyzed. A streamed play gives the same counts as a normal play with the same seed.
+        A Tally keeps every distinct combination and permutation. When there are too many of them, a Sketch can be given instead:
+        the play is streamed into it and its approximate counts use a fixed amount of memory.
+        With workers greater than 1 the rolls are split into one block per worker and played in a pool of processes.
+        Each block gets its own random stream spawned from the seed, and the blocks (or their tallies) are joined in order,
+        so the results are the same for a given seed and number of workers.
+        With a PlayCache and a seed that is an integer or SeedSequence, a play that was already made with the same dice,
+        weights, rolls, seed and workers is loaded from disk instead of being rolled again.
+        With out, the matrix is written straight to a .npy file through a memory map instead of being kept in memory,
+        and the faces are saved next to it. The file can then be analyzed by passing its path to Analyzer,
+        from as many processes as needed, without loading it.
         ---
         inputs:
         rolls:  Integer
                 Specifies how many time the die should be "rolled"/sampled.
+        seed:   Optional integer, SeedSequence or NumPy Generator used for this play only.
+                Defaults to the random stream of the game, so repeated plays give new results.
+                Playing twice with the same seed gives the same results.
+        chunk_size: Integer, the number of rolls drawn at a time. Defaults to 1,000,000.
+                    It only changes how much memory is used, not the results.
+        stream: Boolean, defaults to False.
+                If True the rolls are not kept. Only the Tally of the play is kept, see show_last_tally.
+        workers:    Integer, the number of processes to play in. Defaults to 1, which plays in this process.
+        cache:  Optional PlayCache. Streamed plays, plays written to a file and plays without a fixed seed are never cached.
+        out:    Optional path of a .npy file to write the face codes to, such as "plays.npy".
+                The faces are saved to a second file with .faces.npy in place of .npy. Cannot be used with stream.
+        sketch: Optional Sketch made with the faces of the game. The rolls are added to it instead of a Tally,
+                which makes the play streamed. show_last_tally and Analyzer then use it.
         outputs:none
         '''
-        die_weights = list(range(len(self.die_list)))
-        for x in range(len(self.die_list)):
-            die_weights[x] = list(self.die_list[x]['weights'])
-
-        newlist= list(range(len(self.die_list)))
-        for y in range(len(self.die_list)):
-            newlist[y] = pd.DataFrame({'side':self.die_list[y].index.tolist(),
-                               'die_probs':die_weights[y]})   
+        if not isinstance(chunk_size, (int, np.integer)) or chunk_size < 1:
+            raise ValueError("The chunk size must be a positive integer")
+        if not isinstance(workers, (int, np.integer)) or workers < 1:
+            raise ValueError("The number of workers must be a positive integer")
+        if workers > 1 and any(isinstance(die, MarkovDie) for die in self.__dice):
+            raise ValueError("The chains of a MarkovDie cannot be split across workers. Please play with workers=1")
+        if sketch is not None:
+            if len(sketch.faces) != len(self.faces) or (sketch.faces != self.faces).any():
+                raise ValueError("The sketch must be made with the faces of the game")
+            stream = True
+        if stream and out is not None:
+            raise ValueError("A streamed play does not keep its rolls, so it cannot be written to a file")
+        self.__cache_entry = None
+        key = None
+        if cache is not None and not stream and out is None:
+            key = self._cache_key(rolls, seed, workers)
+            codes = None if key is None else cache.get(key)
+            if codes is not None:
+                self.__codes = codes
+                self.__tally = None
+                self.__cache_entry = (cache, key)
+                return
+        rng = self.__rng if seed is None else _get_rng(seed)
+        groups = self._die_groups()
+        if out is not None:
+            out = os.fspath(out)
+            np.lib.format.open_memmap(out, mode='w+', dtype=_code_dtype(len(self.faces)), shape=(rolls, len(self.__dice))).flush()
+            np.save(_faces_path(out), self.faces, allow_pickle=self.faces.dtype.hasobject)
+        if workers == 1:
+            result = _play_rolls(groups, self.faces, rng, rolls, rolls, chunk_size, stream if sketch is None else sketch, out)
+        else:
+            shard_rolls = [rolls // workers + (k < rolls % workers) for k in range(workers)]
+            offsets = np.cumsum([0] + shard_rolls[:-1]).tolist()
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(_play_rolls, [groups] * workers, [self.faces] * workers, spawn_generators(rng, workers),
+                                      shard_rolls, [rolls] * workers, [chunk_size] * workers,
+                                      [stream] * workers if sketch is None else [sketch._empty() for k in range(workers)],
+                                      [out] * workers, offsets))
+            if out is not None:
+                result = None
+            elif stream:
+                result = Tally(self.faces) if sketch is None else sketch
+                for part in parts:
+                    result.merge(part)
+            else:
+                result = np.concatenate(parts)
+        if out is not None:
+            result = np.load(out, mmap_mode='r')
+        if stream:
+            self.__codes = None
+            self.__tally = result
+        else:
+            self.__codes = result
+            self.__tally = None
+        if key is not None:
+            cache.put(key, result)
+            self.__cache_entry = (cache, key)
 
-        results=  list(range(len(self.die_list)))
-        for k in range(len(self.die_list)):
-            test = newlist[k]
-            results[k] = [test.side.sample(weights=die_weights[k], replace = True).values[0].tolist() for i in range(rolls)]
-    
-        self.__outcome = pd.DataFrame(columns = list(range(len(self.die_list))),
-                                index= list(range(rolls)),
-                                data = []
-                                 )
-        length =  len(self.__outcome.columns)
-        for col in range(length):
-            self.__outcome[col] = results[col]
-        self.__outcome.index.name = 'roll_number'
-
-    def show_last_play (self, format = "wide"):
-        ''' 
-        Used to see the results of the most recent play. 
-        Returns the private dataframe created by the play class.
-        The data can be returned in 'narrow' or 'wide' format and an error will be raised if a different format is supplied by the user.
+    def _cache_key(self, rolls, seed, workers):
+        '''
+        Builds the key of a play for a PlayCache from a hash of everything that decides its results:
+        the version of the package, the faces of the game, the faces, distribution, transitions and sampler of each die,
+        the number of rolls, the seed and the number of workers.
         ---
         inputs:
-        format: "narrow" or "wide"
-                Format defaults to wide but the user can choose to have the data presented in narrow format by entering "narrow".
+        rolls:  Integer, the number of rolls.
+        seed:   The seed given to play.
+        workers:    Integer, the number of workers.
         outputs:
-        last_play:  Dataframe of the results of the most recent play. 
-                    Can be in either wide or narrow format.
+        key: String, or None if the seed is not an integer or SeedSequence, since other plays cannot be repeated.
         '''
-        if format == "wide":
-            last_play = self.__outcome
-            return last_play
-        if format == "narrow":
-            last_play = pd.DataFrame(self.__outcome.unstack())
-            last_play.index = last_play.index.reorder_levels(order=[1, 0])
-            last_play.index.names = ['roll_number', 'die_number']
-            return last_play
+        if isinstance(seed, (int, np.integer)):
+            seed_repr = repr(int(seed))
+        elif isinstance(seed, np.random.SeedSequence):
+            seed_repr = repr((seed.entropy, seed.spawn_key, seed.pool_size))
         else:
-            raise ValueError(f"{format} is not an acceptable format. Please enter 'narrow' or 'wide'")
-             
+            return None
+        digest = hashlib.sha256()
+        digest.update(repr((__version__, self.faces.tolist(), int(rolls), seed_repr, int(workers))).encode())
+        for die in self.__dice:
+            digest.update(repr((die.faces.tolist(), die.sampler)).encode())
+            digest.update(die._cdf().tobytes())
+            if isinstance(die, MarkovDie):
+                digest.update(die._transition_cdfs().tobytes())
+        key = digest.hexdigest()
+        return key
+
+    def _cache_entry(self):
+        '''
+        Returns the (PlayCache, key) pair of the last play if it was cached, or None.
+        '''
+        return self.__cache_entry
+
+    async def play_async(self, rolls, seed=None, chunk_size=100000, stream=False, executor=None, progress=None, limit=None):
+        '''
+        Plays the dice like play without blocking the event loop, for use from asyncio code such as a request handler.
+        Each chunk of rolls is played in an executor, a thread pool by default, and the coroutine waits for it,
+        so other tasks run between and during the chunks. The random Generator and the state of any MarkovDie are passed
+        from chunk to chunk, so a process pool can be used too and a given seed gives the same rolls as play.
+        The play can be cancelled between chunks. A cancelled play does not change the last play of the game.
+        When several plays of the same game run at once, the one that finishes last is kept as the last play.
+        ---
+        inputs:
+        rolls:  Integer, the number of rolls.
+        seed:   Optional integer, SeedSequence or NumPy Generator used for this play only.
+                Defaults to a new stream spawned from the random stream of the game, so plays running at once do not share one.
+                A Generator that is passed in is advanced past the draws of the play, like in play.
+        chunk_size: Integer, the number of rolls handed to the executor at a time. Defaults to 100,000.
+                    Smaller chunks let the play be cancelled and report progress sooner.
+        stream: Boolean, defaults to False. If True only a Tally of the play is kept, as in play.
+        executor:   Optional concurrent.futures executor. Defaults to the default thread pool of the event loop.
+        progress:   Optional function called after each chunk with the number of rolls done and the total number of rolls.
+                    It may be a coroutine function, in which case it is awaited.
+        limit:  Optional asyncio.Semaphore shared by plays (and Analyzer.count_async calls) that should not all run at once.
+                The play waits for the semaphore before its first chunk and holds it until it ends.
+        outputs: none
+        '''
+        import asyncio
+        import contextlib
+        import inspect
+        if not isinstance(chunk_size, (int, np.integer)) or chunk_size < 1:
+            raise ValueError("The chunk size must be a positive integer")
+        async with contextlib.nullcontext() if limit is None else limit:
+            loop = asyncio.get_running_loop()
+            rng = spawn_generators(self.__rng, 1)[0] if seed is None else _get_rng(seed)
+            groups = self._die_groups()
+            states = {}
+            if stream:
+                result = Tally(self.faces)
+                result.update(np.empty((0, len(self.__dice)), dtype=_code_dtype(len(self.faces))))
+            else:
+                result = np.empty((rolls, len(self.__dice)), dtype=_code_dtype(len(self.faces)))
+            done = 0
+            while done < rolls:
+                n = min(chunk_size, rolls - done)
+                part, rng, states = await loop.run_in_executor(executor, _roll_chunk, groups, self.faces, rng, n, rolls, states, stream)
+                if stream:
+                    result.merge(part)
+                else:
+                    result[done:done + n] = part
+                done += n
+                if progress is not None:
+                    update = progress(done, rolls)
+                    if inspect.isawaitable(update):
+                        await update
+            if isinstance(seed, np.random.Generator) and rng is not seed:
+                seed.bit_generator.state = rng.bit_generator.state
+            self.__codes, self.__tally = (None, result) if stream else (result, None)
+            self.__cache_entry = None
+
+    def play_until(self, statistic="jackpot", rel_error=None, ci_width=None, confidence=0.95,
+                   batch_size=10000, max_rolls=100000000, seed=None):
+        '''
+        Plays the dice in batches until the rate of an event per roll is estimated precisely enough, then stops.
+        After each batch the Wilson score interval of the rate is computed, and rolling stops once it meets the target.
+        The play is kept like a streamed play, so an Analyzer can be used on it afterwards.
+        ---
+        inputs:
+        statistic:  "jackpot", or a function that takes a NumPy array of face codes (one row per roll) and the faces of the game
+                    and returns a boolean NumPy array with one value per roll.
+                    Defaults to "jackpot".
+        rel_error:  Optional float. Stop once half the width of the interval divided by the estimate is at most rel_error.
+        ci_width:   Optional float. Stop once the width of the interval is at most ci_width.
+                    At least one of rel_error and ci_width must be given.
+        confidence: Float between 0 and 1, the confidence level of the interval. Defaults to 0.95.
+        batch_size: Integer, the number of rolls played between checks. Defaults to 10,000.
+        max_rolls:  Integer, the most rolls to play if the target is never met. Defaults to 100,000,000.
+        seed:   Optional integer, SeedSequence or NumPy Generator used for this play only.
+        outputs:
+        result: python dictionary with the estimate, ci_low, ci_high, the number of rolls used
+                and converged, which is False if max_rolls was reached first.
+        '''
+        if rel_error is None and ci_width is None:
+            raise ValueError("Please give a target rel_error or ci_width")
+        if not 0 < confidence < 1:
+            raise ValueError("The confidence must be between 0 and 1")
+        if not isinstance(batch_size, (int, np.integer)) or batch_size < 1:
+            raise ValueError("The batch size must be a positive integer")
+        if not isinstance(max_rolls, (int, np.integer)) or max_rolls < 1:
+            raise ValueError("The maximum number of rolls must be a positive integer")
+        if statistic == "jackpot":
+            statistic = lambda codes, faces: codes.min(axis=1) == codes.max(axis=1)
+        elif not callable(statistic):
+            raise ValueError(f"{statistic} is not an acceptable statistic. Please enter 'jackpot' or a function")
+        from statistics import NormalDist
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        rng = self.__rng if seed is None else _get_rng(seed)
+        groups = self._die_groups()
+        tally = Tally(self.faces)
+        states = {}
+        hits = 0
+        converged = False
+        while tally.n_rolls < max_rolls and not converged:
+            codes = _roll_codes(groups, len(self.faces), rng, min(batch_size, max_rolls - tally.n_rolls), batch_size, states)
+            hits += int(np.count_nonzero(statistic(codes, self.faces)))
+            tally.update(codes)
+            ci_low, ci_high = _wilson_interval(hits, tally.n_rolls, z)
+            converged = (ci_width is None or ci_high - ci_low <= ci_width) and \
+                (rel_error is None or (hits > 0 and (ci_high - ci_low) / 2 <= rel_error * hits / tally.n_rolls))
+        self.__codes = None
+        self.__tally = tally
+        self.__cache_entry = None
+        result = {'estimate': hits / tally.n_rolls, 'ci_low': ci_low, 'ci_high': ci_high,
+                  'rolls': tally.n_rolls, 'converged': bool(converged)}
+        return result
+
+    def _die_groups(self):
+        '''
+        Groups the columns of the game by die, so a die used several times is sampled in one call.
+        ---
+        inputs: none
+        outputs:
+        groups: python list of (die, list of column numbers, face codes of the die) in order of first appearance.
+        '''
+        groups = {}
+        for k, die in enumerate(self.__dice):
+            groups.setdefault(id(die), (die, [], self.__face_codes[id(die)]))[1].append(k)
+        return list(groups.values())
+
+    def show_last_codes(self):
+        '''
+        Used to see the results of the most recent play without building a dataframe.
+        ---
+        inputs: none
+        outputs:
+        codes:  NumPy array with one row per roll and one column per die holding the code of each face rolled.
+        faces:  NumPy array of faces, where faces[code] is the face for a code.
+        '''
+        if self.__codes is None:
+            raise ValueError("The last play was streamed, so its rolls were not kept. Please use show_last_tally.")
+        return self.__codes, self.faces
+
+    def show_face_codes(self):
+        '''
+        Used to see how the faces of each die are mapped into the faces of the game.
+        ---
+        inputs: none
+        outputs:
+        face_codes: python list with one NumPy array per die, in the order of the dice,
+                    where face_codes[k][i] is the code in the faces attribute of face i of die k.
+        '''
+        face_codes = [self.__face_codes[id(die)].copy() for die in self.__dice]
+        return face_codes
+
+    def show_last_tally(self):
+        '''
+        Used to see the running counts of the most recent play.
+        For a streamed play this is the Tally built while rolling. Otherwise a Tally is built from the face codes.
+        ---
+        inputs: none
+        outputs:
+        tally: Tally of the jackpots, faces, combinations and permutations of the last play.
+        '''
+        if self.__tally is not None:
+            return self.__tally
+        tally = Tally(self.faces)
+        tally.update(self.__codes)
+        return tally
+
+    def _check_independent(self):
+        '''
+        Raises a ValueError if a die of the game is a MarkovDie, for the methods that assume the rolls are independent.
+        '''
+        if any(isinstance(die, MarkovDie) for die in self.__dice):
+            raise ValueError("This method assumes independent rolls, which a MarkovDie does not have")
+
+    def _face_probabilities(self, cdfs=None):
+        '''
+        Builds the probability of each face of the game for each die from the weights of the dice.
+        ---
+        inputs:
+        cdfs:   Optional python list with the cumulative distribution of each die. Defaults to the current weights of the dice.
+        outputs:
+        probs: NumPy array with one row per die and one column per face in faces.
+        '''
+        self._check_independent()
+        if cdfs is None:
+            cdfs = [die._cdf() for die in self.__dice]
+        probs = np.zeros((len(self.__dice), len(self.faces)))
+        for k, die in enumerate(self.__dice):
+            probs[k, self.__face_codes[id(die)]] = np.diff(cdfs[k], prepend=0.0)
+        return probs
+
+    def sweep(self, configs, rolls, seed=None, chunk_size=1000000):
+        '''
+        Plays the dice under each of a list of weight configurations using common random numbers.
+        One batch of uniform draws is made for every chunk of rolls and mapped through the cumulative distribution
+        of each configuration, so the configurations differ only because of their weights. This costs one set of
+        random draws for the whole sweep and makes the differences between configurations much less noisy.
+        The weights of the dice themselves are not changed.
+        ---
+        inputs:
+        configs:    Python list of weight configurations. Each configuration is one of:
+                    a python dictionary of {face: new weight} applied to every die on top of its current weights,
+                    an array-like of weights for every face, used for every die,
+                    or a python list with one dictionary or array-like per die in the game.
+        rolls:  Integer, the number of rolls played under each configuration.
+        seed:   Optional integer, SeedSequence or NumPy Generator used for the sweep.
+        chunk_size: Integer, the number of rolls drawn at a time. Defaults to 1,000,000.
+        outputs:
+        sweep_df:   Data frame with one row per configuration, indexed by its position in configs, with columns for
+                    the rolls, jackpots, jackpot rate, exact jackpot rate, and the number of distinct combinations and permutations.
+        '''
+        import pandas as pd
+        if not isinstance(chunk_size, (int, np.integer)) or chunk_size < 1:
+            raise ValueError("The chunk size must be a positive integer")
+        self._check_independent()
+        n_dice = len(self.__dice)
+        config_cdfs = []
+        for config in configs:
+            per_die = isinstance(config, (list, tuple)) and len(config) == n_dice and \
+                all(isinstance(weights, dict) or np.ndim(weights) == 1 for weights in config)
+            config_cdfs.append([_cumulative_weights(die._updated_weights(config[k] if per_die else config))
+                                for k, die in enumerate(self.__dice)])
+        rng = self.__rng if seed is None else _get_rng(seed)
+        dtype = _code_dtype(len(self.faces))
+        tallies = [Tally(self.faces) for _ in configs]
+        for start in range(0, rolls, chunk_size):
+            u = rng.random((min(chunk_size, rolls - start), n_dice))
+            for cdfs, tally in zip(config_cdfs, tallies):
+                codes = np.empty(u.shape, dtype=dtype)
+                for k, die in enumerate(self.__dice):
+                    codes[:, k] = self.__face_codes[id(die)][_sample_indices(cdfs[k], u[:, k])]
+                tally.update(codes)
+        rows = []
+        for cdfs, tally in zip(config_cdfs, tallies):
+            rows.append({'rolls': tally.n_rolls,
+                         'jackpots': tally.count_jackpots(),
+                         'jackpot_rate': tally.count_jackpots() / max(tally.n_rolls, 1),
+                         'expected_jackpot_rate': float(self._face_probabilities(cdfs).prod(axis=0).sum()),
+                         'combos': len(tally.count_combos()) if tally.n_rolls else 0,
+                         'permutations': len(tally.count_permutations()) if tally.n_rolls else 0})
+        sweep_df = pd.DataFrame(rows, index=pd.RangeIndex(len(rows), name='config'))
+        return sweep_df
+
+    def expected_jackpot_rate(self):
+        '''
+        Calculates the exact probability that a roll is a jackpot from the weights of the dice.
+        This is the sum over the faces of the product of the probability of each die rolling that face.
+        ---
+        inputs: none
+        outputs:
+        rate: float, the probability that all the dice show the same face.
+        '''
+        rate = float(self._face_probabilities().prod(axis=0).sum())
+        return rate
+
+    def expected_face_counts(self, rolls=1):
+        '''
+        Calculates the exact expected number of times each face is rolled, summed over every die.
+        This can be compared with Tally.count_faces to check a simulation.
+        ---
+        inputs:
+        rolls:  Integer, the number of rolls. Defaults to 1.
+        outputs:
+        face_count: Data frame with the faces as the index and a single count column of expected counts.
+        '''
+        import pandas as pd
+        face_count = pd.DataFrame({'count': self._face_probabilities().sum(axis=0) * rolls},
+                                  index=pd.Index(self.faces, name='face'))
+        return face_count
+
+    def exact_combos(self, max_outcomes=1000000):
+        '''
+        Calculates the exact probability of every distinct combination of faces from the weights of the dice.
+        Combinations that cannot be rolled are left out.
+        ---
+        inputs:
+        max_outcomes:   Integer, the largest number of outcomes to compute. Defaults to 1,000,000.
+                        A ValueError is raised for games with more outcomes.
+        outputs:
+        combo_prob_df:  Dataframe with a MultiIndex of distinct combinations, in the layout of Analyzer.count_combos,
+                        and a single column of probabilities.
+        '''
+        rows, probs = _exact_rows(self._face_probabilities(), True, max_outcomes)
+        combo_prob_df = _label_rows(self.faces, rows, probs, 'probability')
+        return combo_prob_df
+
+    def exact_permutations(self, max_outcomes=1000000):
+        '''
+        Calculates the exact probability of every distinct permutation of faces from the weights of the dice.
+        Permutations that cannot be rolled are left out.
+        ---
+        inputs:
+        max_outcomes:   Integer, the largest number of outcomes to compute. Defaults to 1,000,000.
+                        A ValueError is raised for games with more outcomes.
+        outputs:
+        perm_prob_df:   Dataframe with a MultiIndex of distinct permutations, in the layout of Analyzer.count_permutations,
+                        and a single column of probabilities.
+        '''
+        rows, probs = _exact_rows(self._face_probabilities(), False, max_outcomes)
+        perm_prob_df = _label_rows(self.faces, rows, probs, 'probability')
+        return perm_prob_df
+
+    def _last_tally(self):
+        '''
+        Returns the Tally (or Sketch) kept by a streamed play, or None if the rolls of the last play were kept.
+        '''
+        return self.__tally
+
+    @_profiled("Game.show_last_play", lambda last_play, *args, **kwargs: len(last_play))
+    def show_last_play (self, format = "wide", categorical = False):
+        ''' 
+        Used to see the results of the most recent play. 
+        Builds a dataframe of faces from the private matrix of face codes created by the play method.
+        The data can be returned in 'narrow' or 'wide' format and an error will be raised if a different format is supplied by the user.
+        ---
+        inputs:
+        format: "narrow" or "wide"
+                Format defaults to wide but the user can choose to have the data presented in narrow format by entering "narrow".
+        categorical:    Boolean, defaults to False.
+                        If True the columns are pandas Categoricals that share the face codes instead of copies of the faces.
+        outputs:
+        last_play:  Dataframe of the results of the most recent play. 
+                    Can be in either wide or narrow format.
+                    The narrow format lists every roll of the first die, then every roll of the second die, and so on.
+                    It is built straight from the face codes, with the index codes made by np.tile and np.repeat.
+        '''
+        import pandas as pd
+        if format not in ("wide", "narrow"):
+            raise ValueError(f"{format} is not an acceptable format. Please enter 'narrow' or 'wide'")
+        codes, _ = self.show_last_codes()
+        if format == "wide":
+            last_play = _wide_frame(codes, self.faces, categorical)
+            return last_play
+        if format == "narrow":
+            n_rolls, n_dice = codes.shape
+            index = pd.MultiIndex(levels=[pd.RangeIndex(n_rolls), pd.RangeIndex(n_dice)],
+                                  codes=[np.tile(np.arange(n_rolls), n_dice), np.repeat(np.arange(n_dice), n_rolls)],
+                                  names=['roll_number', 'die_number'])
+            flat_codes = np.asarray(codes).T.ravel()
+            if categorical:
+                values = pd.Categorical.from_codes(flat_codes, categories=self.faces)
+            else:
+                values = self.faces[flat_codes]
+            last_play = pd.DataFrame({0: values}, index=index)
+            return last_play
+
+    def iter_narrow(self, chunk_size=1000000):
+        '''
+        Yields the most recent play in narrow format, chunk_size rolls of one die at a time, as plain NumPy columns.
+        The columns can be handed to pyarrow, written to disk, or turned into a data frame one chunk at a time,
+        so plays that do not fit in memory in narrow format can still be exported.
+        The rows are in the same order as show_last_play("narrow"): every roll of the first die, then every roll of the
+        second die, and so on. Each die is one pass over the face codes, read a chunk of rolls at a time.
+        ---
+        inputs:
+        chunk_size: Integer, the number of rolls in each chunk. Defaults to 1,000,000.
+        outputs:
+        chunk:  python dictionary with NumPy arrays roll_number, die_number and face, one entry per roll of one die.
+        '''
+        codes, _ = self.show_last_codes()
+        for die in range(codes.shape[1]):
+            for start in range(0, len(codes), chunk_size):
+                column = np.asarray(codes[start:start + chunk_size, die])
+                chunk = {'roll_number': np.arange(start, start + len(column)),
+                         'die_number': np.full(len(column), die),
+                         'face': self.faces[column]}
+                yield chunk
+
+    def write_narrow(self, path, chunk_size=1000000):
+        '''
+        Writes the most recent play to disk in narrow format, one chunk of rolls at a time, see iter_narrow.
+        The rows are in the same order as show_last_play("narrow").
+        A path ending in .parquet is written as a Parquet file, which needs the pyarrow package. Any other path is written as CSV.
+        ---
+        inputs:
+        path:   String or path of the file to write.
+        chunk_size: Integer, the number of rolls written at a time. Defaults to 1,000,000.
+        outputs: none
+        '''
+        import pandas as pd
+        path = os.fspath(path)
+        if path.endswith('.parquet'):
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError("Writing Parquet files needs the pyarrow package. Please install it or write a CSV file.")
+            writer = None
+            for chunk in self.iter_narrow(chunk_size):
+                table = pyarrow.table(chunk)
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            if writer is not None:
+                writer.close()
+        else:
+            header = True
+            for chunk in self.iter_narrow(chunk_size):
+                pd.DataFrame(chunk).to_csv(path, mode='w' if header else 'a', header=header, index=False)
+                header = False
+             
     
 
 
@@ -212,9 +1546,12 @@ class Analyzer:
     Takes the results of a game played via the Game class and computes statistics about said game.
     ---
     methods:
-    __init__:   Initializer. It takes in an instance of the Game class.
-                If the input is not an instance of the Game class, a ValueError will be raised.
+    __init__:   Initializer. It takes in an instance of the Game class, or the path of a file written by Game.play(out=...).
+                If the input is not an instance of the Game class or a path, a ValueError will be raised.
                 A dataframe named data is created. Data holds the information for the last play from the game class.
+                If the last play was streamed, the counts are taken from the Tally of the play instead.
+                A file is memory mapped and read in slices, so it does not have to fit in memory.
+                Faces saved with pickle (object faces) are only loaded with allow_pickle=True.
 
     count_jackpots: A jackpot is when all the faces for a given roll are the same.
                     The count_jackpots method counts the number of times a game resulted in a jackpot and returns an integer.
@@ -229,85 +1566,1071 @@ class Analyzer:
     count_permutaions:  Counts the number of disinct permutations among the rolls.
                         A distinct permutation is order-dependent and can include repetitions.
                         A data frame of the permutations and counts is returned.
+
+    count_words:    Counts the distinct permutations that spell a word from a word list.
+                    A data frame of the matching permutations and counts is returned.
+
+    sketch: Counts the rolls approximately in a Sketch of fixed size, for plays with too many distinct permutations to count exactly.
+            If the last play was streamed into a Sketch, the counts of the Analyzer come from it.
+
+    count_async:    Coroutine that runs one of the count methods (or sketch) in an executor, so an event loop is not blocked.
+
+    If the game was played with a PlayCache that keeps summaries, the jackpot, combination and permutation counts
+    are saved with the play and loaded from disk the next time.
     ---
     attributes:
     data: a data frame of the last play.
+          It is only built the first time it is used, since every count is computed from the face codes of the game.
 
     '''  
-    def __init__(self, game):
+    def __init__(self, game, allow_pickle=False):
         ''' 
         Initializer. Takes in a an instance of the Game class. 
-        From the input of the game class the method show_last_play is called to create a data frame of the the last play.
+        From the input of the game class the method show_last_codes is called to get the face codes of the last play.
+        The data frame of the last play is created from show_last_play the first time data is used.
+        A path to a file written by Game.play(out=...) can be given instead. The file is opened read only as a memory map.
         ---
         inputs:
-        game:   A Game object/instnace of the game class.
-                If game is not a Game object, a ValueError will be raised.
+        game:   A Game object/instnace of the game class, or the path of a .npy file of face codes written by Game.play.
+                If game is not a Game object or a path, a ValueError will be raised.
+        allow_pickle:   Boolean, defaults to False. Whether the faces file of a path may be loaded with pickle,
+                        which Game.play uses for faces of object dtype. Loading a pickle can run any code,
+                        so only set it for files you trust. Without it such a file raises a ValueError.
         outputs: 
         data: Data frame of the last play.
         '''
-        if not isinstance(game, Game):
+        if isinstance(game, (str, os.PathLike)):
+            self.__game = None
+            self.__tally = None
+            self.__codes = np.load(game, mmap_mode='r')
+            self.__faces = np.load(_faces_path(game), allow_pickle=allow_pickle)
+            self.__cache_entry = None
+            self.__data = None
+        elif not isinstance(game, Game):
             raise ValueError("This is not a Game object. Please input a Game object.")
         else:
-            self.data = game.show_last_play()
+            self.__game = game
+            self.__tally = game._last_tally()
+            self.__codes, self.__faces = (None, game.faces) if self.__tally is not None else game.show_last_codes()
+            self.__cache_entry = game._cache_entry()
+            self.__data = None
+
+    @property
+    def data(self):
+        '''
+        Data frame of the last play, built from the game (or the file) the first time it is used.
+        '''
+        if self.__data is None:
+            self.__data = self.__game.show_last_play() if self.__game is not None else _wide_frame(self.__codes, self.__faces)
+        return self.__data
+
+    def _n_rolls(self):
+        '''
+        Returns the number of rolls in the last play.
+        '''
+        return self.__tally.n_rolls if self.__tally is not None else len(self.__codes)
+
+    def _load_summary(self, name):
+        '''
+        Returns a summary saved for the last play in the PlayCache of the game, or None if there is none.
+        '''
+        if self.__cache_entry is None or not self.__cache_entry[0].summaries:
+            return None
+        cache, key = self.__cache_entry
+        return cache.get_summary(key, name)
+
+    def _save_summary(self, name, summary):
+        '''
+        Saves a summary of the last play in the PlayCache of the game, if the game was played with one that keeps summaries.
+        Summaries are NumPy arrays of integers: the jackpot count, or distinct rows of face codes with their counts
+        in the last column, from which _label_rows builds the data frame again.
+        '''
+        if self.__cache_entry is not None and self.__cache_entry[0].summaries:
+            cache, key = self.__cache_entry
+            cache.put_summary(key, name, summary)
 
+
+    @_profiled("Analyzer.count_jackpots", lambda result, self, *args, **kwargs: self._n_rolls())
     def count_jackpots(self):
         ''' 
         Calculates the number of times a game resulted in a jackpot and returns and integer.
         A jackpot is when all the faces for a given roll are the same.
-        For each row of the data, this method finds the number of unique values. If the number of unique values is greater than 1, that roll was not a jackpot.
-        For each row where the number of unique values is equal to one, the jackpot count goes up by one.
+        A roll is a jackpot when the smallest and largest face codes in its row are equal, which is checked for every row at once.
         ---
         inputs:none
         outputs: 
         jack_count: integer, the number of jackpots
         '''
+        if self.__tally is not None:
+            return self.__tally.count_jackpots()
+        summary = self._load_summary('count_jackpots')
+        if summary is not None:
+            return int(summary[0])
         jack_count = 0
-        for i in range(len(self.data)):
-            if len(self.data.iloc[i].unique()) == 1:
-                jack_count += 1
-            else:
-                jack_count = jack_count
+        for codes in self._slices():
+            jack_count += int(np.count_nonzero(codes.min(axis=1) == codes.max(axis=1)))
+        self._save_summary('count_jackpots', np.array([jack_count], dtype=np.int64))
         return jack_count
     
+    @_profiled("Analyzer.count_faces", lambda result, self, *args, **kwargs: self._n_rolls())
     def count_faces(self):
         ''' 
-        Counts the number of times a given face appears in one roll using the value_counts() method with a lambda function.
-        The lambda function is the applied across the data frame to calculate the face counts for each roll.
+        Counts the number of times a given face appears in one roll.
+        Each die adds one to the count of the face it rolled in every row at once, and only faces that were rolled at least once are kept.
         ---
         inputs: none
         outputs: 
         face_count: Data frame with roll number as the index, faces as the columns and counts for each face appearance as the data.
         '''
-        row_count = lambda row: row.value_counts()
-        face_count = self.data.apply(row_count, axis = 1).fillna(0).astype(int)
+        import pandas as pd
+        if self.__tally is not None:
+            raise ValueError("Face counts per roll need the rolls of the last play, which was streamed. Please use Tally.count_faces for totals.")
+        counts = np.zeros((len(self.__codes), len(self.__faces)), dtype=np.int64)
+        start = 0
+        for codes in self._slices():
+            rows = np.arange(start, start + len(codes))
+            for k in range(codes.shape[1]):
+                counts[rows, codes[:, k]] += 1
+            start += len(codes)
+        rolled = counts.any(axis=0)
+        face_count = pd.DataFrame(counts[:, rolled], columns=self.__faces[rolled],
+                                  index=pd.RangeIndex(len(counts), name='roll_number'))
         return face_count
     
+    @_profiled("Analyzer.count_combos", lambda result, self, *args, **kwargs: self._n_rolls())
     def count_combos(self):
         ''' 
         This method calculates the distinct combination of faces rolled and their counts.
         A distinct combination is not dependent on order and may have repetitions.
+        The face codes of each roll are sorted, which sorts the faces since the faces of the game are in sorted order,
+        and the distinct sorted rows are counted.
         ---
         inputs: none
         outputs: 
         combo_count_df: Dataframe with a MultiIndex of distinct combinations and a single column for the associated counts.
         '''
-        row_combos = self.data.apply(lambda row: tuple(sorted(row)), axis = 1)
-        combo_count = row_combos.value_counts()
-        combo_count_df = pd.DataFrame(combo_count)
-        combo_count_df.index = pd.MultiIndex.from_tuples(combo_count_df.index)
+        if self.__tally is not None:
+            return self.__tally.count_combos()
+        summary = self._load_summary('count_combos')
+        if summary is None:
+            rows, counts = self._count_sliced_rows(True)
+            self._save_summary('count_combos', np.column_stack([rows, counts]).astype(np.int64))
+        else:
+            rows, counts = summary[:, :-1], summary[:, -1]
+        combo_count_df = _label_rows(self.__faces, rows, counts)
         return combo_count_df
     
+    @_profiled("Analyzer.count_permutations", lambda result, self, *args, **kwargs: self._n_rolls())
     def count_permutations(self):
         ''' 
         Calculates the distinct permutations of faces rolled in a game and their counts.
         A permutaiton is dependent on order and may contain repetitions.
+        The distinct rows of face codes are counted directly.
         ---
         inputs:none
         outputs:
         perm_count_df: Datareame with a MultiIndex of distinct permutations and a column for the associated counts.
         '''
-        row_perm = self.data.apply(lambda row: tuple(row), axis = 1)
-        perm_count = row_perm.value_counts()
-        perm_count_df = pd.DataFrame(perm_count)
-        perm_count_df.index = pd.MultiIndex.from_tuples(perm_count_df.index)
-        return perm_count_df
\ No newline at end of file
+        summary = self._load_summary('count_permutations')
+        if summary is None:
+            rows, counts = self._permutation_rows()
+            self._save_summary('count_permutations', np.column_stack([rows, counts]).astype(np.int64))
+        else:
+            rows, counts = summary[:, :-1], summary[:, -1]
+        perm_count_df = _label_rows(self.__faces, rows, counts)
+        return perm_count_df
+
+    def _permutation_rows(self):
+        '''
+        Returns the distinct permutations of the last play as rows of face codes with their counts, in value_counts order.
+        '''
+        if self.__tally is not None:
+            return self.__tally._permutation_rows()
+        return self._count_sliced_rows(False)
+
+    def _slices(self):
+        '''
+        Yields the face codes of the last play _SLICE_ROWS rows at a time, so a memory mapped file is read one slice at a time.
+        '''
+        for start in range(0, len(self.__codes), _SLICE_ROWS):
+            yield np.asarray(self.__codes[start:start + _SLICE_ROWS])
+
+    def _count_sliced_rows(self, order_free):
+        '''
+        Counts the distinct rows of the face codes one slice at a time, merging the counts of each slice.
+        ---
+        inputs:
+        order_free: Boolean. If True the codes of each row are sorted first, which counts combinations instead of permutations.
+        outputs:
+        rows:   NumPy array with one distinct row of codes per line, in value_counts order.
+        counts: NumPy array with the number of times each distinct row appears.
+        '''
+        unique = None
+        start = 0
+        for codes in self._slices():
+            codes = np.sort(codes, axis=1) if order_free else codes
+            unique = _merge_rows(unique, _unique_rows(codes, len(self.__faces), start))
+            start += len(codes)
+        if unique is None:
+            return _count_rows(self.__codes, len(self.__faces))
+        return _order_rows(unique)
+
+    @_profiled("Analyzer.sketch", lambda result, self, *args, **kwargs: self._n_rolls())
+    def sketch(self, width=2048, depth=5, precision=12, top_k=100):
+        '''
+        Adds the rolls of the last play to a new Sketch one slice at a time, so a play with more distinct permutations
+        than fit in memory, such as a memory mapped file, can still be summarized.
+        ---
+        inputs:
+        width, depth, precision, top_k: Integers, the size of the Sketch. See Sketch.
+        outputs:
+        sketch: Sketch of the last play.
+        '''
+        if self.__tally is not None:
+            raise ValueError("The rolls of the last play were streamed. Please play again with a Sketch.")
+        sketch = Sketch(self.__faces, width, depth, precision, top_k)
+        for codes in self._slices():
+            sketch.update(codes)
+        return sketch
+
+    async def count_async(self, method, *args, executor=None, limit=None):
+        '''
+        Runs one of the count methods (or sketch) in an executor and waits for it without blocking the event loop.
+        A thread pool is best, since a process pool has to copy the Analyzer and its rolls to the worker.
+        ---
+        inputs:
+        method: "count_jackpots", "count_faces", "count_combos", "count_permutations", "count_words" or "sketch".
+                An error will be raised for any other value.
+        args:   Arguments of the method, such as the words of count_words.
+        executor:   Optional concurrent.futures executor. Defaults to the default thread pool of the event loop.
+        limit:  Optional asyncio.Semaphore shared with other simulations, see Game.play_async.
+        outputs:
+        result: The result of the method.
+        '''
+        import asyncio
+        import contextlib
+        if method not in ("count_jackpots", "count_faces", "count_combos", "count_permutations", "count_words", "sketch"):
+            raise ValueError(f"{method} is not a count method of the Analyzer")
+        async with contextlib.nullcontext() if limit is None else limit:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(executor, getattr(self, method), *args)
+        return result
+
+    @_profiled("Analyzer.count_words", lambda result, self, *args, **kwargs: self._n_rolls())
+    def count_words(self, words):
+        '''
+        Counts the distinct permutations of the last play that spell a word, reading the faces of each roll in order.
+        When every face is a single character the words are encoded as face codes once and matched against the codes
+        of the permutations in bulk, so no string is built for any roll. Otherwise each distinct permutation is joined
+        into one string and looked up in the hashed set of words.
+        Matching ignores case.
+        ---
+        inputs:
+        words:  A WordList, or the path to a text file with one word per line such as scrabble_words.txt.
+        outputs:
+        word_count_df:  Dataframe with a MultiIndex of the permutations that are words and a column for the associated counts,
+                        in the same layout as count_permutations. Its length is the number of distinct words rolled.
+        '''
+        if not isinstance(words, WordList):
+            words = WordList.from_file(words)
+        rows, counts = self._permutation_rows()
+        faces = self.__faces
+        if faces.dtype == np.dtype('<U1'):
+            is_word = np.isin(_row_keys(rows, len(faces)), words._word_keys(faces, rows.dtype, rows.shape[1]))
+        else:
+            labels = faces.astype(str)[rows]
+            strings = labels[:, 0]
+            for k in range(1, rows.shape[1]):
+                strings = np.char.add(strings, labels[:, k])
+            is_word = np.array([string.upper() in words.words for string in strings.tolist()], dtype=bool)
+        word_count_df = _label_rows(faces, rows[is_word], counts[is_word])
+        return word_count_df
+
+
+class Tally:
+    '''
+    Keeps running counts of the rolls of a game, so a play can be analyzed one chunk at a time in bounded memory.
+    ---
+    Methods:
+    __init__:   Initializer. It takes the faces of the game the rolls come from.
+
+    update: Adds a chunk of rolls, given as face codes, to the counts.
+
+    merge:  Adds the counts of another Tally of the same game, as if its rolls came after the rolls of this Tally.
+
+    count_jackpots: Returns the number of jackpots counted so far as an integer.
+
+    count_faces:    Returns a data frame with the total number of times each face was rolled.
+
+    count_combos:   Returns a data frame of the distinct combinations counted so far, in the same layout as Analyzer.count_combos.
+
+    count_permutations: Returns a data frame of the distinct permutations counted so far, in the same layout as Analyzer.count_permutations.
+    ---
+    Attributes:
+    faces: NumPy array of faces, where faces[code] is the face for a code.
+    n_rolls: Integer, the number of rolls counted so far.
+    '''
+    def __init__(self, faces):
+        '''
+        Initializer for the Tally class. All counts start at zero.
+        ---
+        inputs:
+        faces:  NumPy array of faces of the game, such as Game.faces.
+        outputs: none
+        '''
+        self.faces = faces
+        self.n_rolls = 0
+        self.__jackpots = 0
+        self.__face_totals = np.zeros(len(faces), dtype=np.int64)
+        self.__combos = None
+        self.__perms = None
+
+    def update(self, codes):
+        '''
+        Adds a chunk of rolls to the counts.
+        ---
+        inputs:
+        codes:  NumPy array of face codes with one row per roll and one column per die.
+                An empty chunk adds no counts, but sets the number of dice, so the counts of a Tally without rolls
+                are empty data frames instead of errors.
+        outputs: none
+        '''
+        n_faces = len(self.faces)
+        self.__jackpots += int(np.count_nonzero(codes.min(axis=1) == codes.max(axis=1)))
+        self.__face_totals += np.bincount(codes.ravel(), minlength=n_faces)
+        self.__combos = _merge_rows(self.__combos, _unique_rows(np.sort(codes, axis=1), n_faces, self.n_rolls))
+        self.__perms = _merge_rows(self.__perms, _unique_rows(codes, n_faces, self.n_rolls))
+        self.n_rolls += len(codes)
+
+    def merge(self, other):
+        '''
+        Adds the counts of another Tally of the same game, treating its rolls as coming after the rolls of this Tally.
+        ---
+        inputs:
+        other:  Tally built with the same faces.
+        outputs: none
+        '''
+        if len(other.faces) != len(self.faces) or (other.faces != self.faces).any():
+            raise ValueError("Only tallies of games with the same faces can be merged")
+        if other.__combos is None:
+            return
+        shift = lambda unique: (unique[0], unique[1] + self.n_rolls, unique[2], unique[3])
+        self.__jackpots += other.count_jackpots()
+        self.__face_totals += other.__face_totals
+        self.__combos = _merge_rows(self.__combos, shift(other.__combos))
+        self.__perms = _merge_rows(self.__perms, shift(other.__perms))
+        self.n_rolls += other.n_rolls
+
+    def count_jackpots(self):
+        '''
+        Returns the number of jackpots counted so far.
+        ---
+        inputs: none
+        outputs:
+        jack_count: integer, the number of jackpots
+        '''
+        jack_count = self.__jackpots
+        return jack_count
+
+    def count_faces(self):
+        '''
+        Returns the total number of times each face was rolled, summed over every die and every roll.
+        ---
+        inputs: none
+        outputs:
+        face_count: Data frame with the faces as the index and a single count column.
+        '''
+        import pandas as pd
+        face_count = pd.DataFrame({'count': self.__face_totals}, index=pd.Index(self.faces, name='face'))
+        return face_count
+
+    def count_combos(self):
+        '''
+        Returns the distinct combinations counted so far and their counts.
+        ---
+        inputs: none
+        outputs:
+        combo_count_df: Dataframe with a MultiIndex of distinct combinations and a single column for the associated counts.
+        '''
+        if self.__combos is None:
+            raise ValueError("No rolls have been counted yet")
+        combo_count_df = _label_rows(self.faces, *_order_rows(self.__combos))
+        return combo_count_df
+
+    def count_permutations(self):
+        '''
+        Returns the distinct permutations counted so far and their counts.
+        ---
+        inputs: none
+        outputs:
+        perm_count_df: Dataframe with a MultiIndex of distinct permutations and a column for the associated counts.
+        '''
+        perm_count_df = _label_rows(self.faces, *self._permutation_rows())
+        return perm_count_df
+
+    def _permutation_rows(self):
+        '''
+        Returns the distinct permutations counted so far as rows of face codes with their counts, in value_counts order.
+        '''
+        if self.__perms is None:
+            raise ValueError("No rolls have been counted yet")
+        return _order_rows(self.__perms)
+
+
+class Sketch:
+    '''
+    Keeps approximate running counts of the rolls of a game in a fixed amount of memory, however many distinct
+    combinations and permutations are rolled. It is used like a Tally, for games with too many dice and faces
+    for every distinct permutation to be kept.
+    Combinations and permutations each get three sketches over a 64-bit hash of their row of face codes:
+    a Count-Min sketch of depth rows of width counters for their counts, a HyperLogLog of 2**precision registers
+    for the number of distinct values, and the top_k values with the largest Count-Min counts seen so far (the heavy hitters).
+    Jackpots and face totals are counted exactly.
+    ---
+    Methods:
+    __init__:   Initializer. It takes the faces of the game the rolls come from and the size of the sketches.
+
+    update: Adds a chunk of rolls, given as face codes, to the sketches.
+
+    merge:  Adds the sketches of another Sketch of the same game and size.
+
+    count_jackpots: Returns the number of jackpots counted so far as an integer.
+
+    count_faces:    Returns a data frame with the total number of times each face was rolled.
+
+    count_combos:   Returns a data frame of the top combinations and their estimated counts, in the same layout as Analyzer.count_combos.
+
+    count_permutations: Returns a data frame of the top permutations and their estimated counts, in the same layout as Analyzer.count_permutations.
+
+    count_distinct: Returns the estimated number of distinct combinations or permutations.
+
+    error_bounds:   Returns the error bounds of the estimates.
+    ---
+    Attributes:
+    faces: NumPy array of faces, where faces[code] is the face for a code.
+    n_rolls: Integer, the number of rolls counted so far.
+    width, depth, precision, top_k: Integers, the size of the sketches.
+    '''
+    def __init__(self, faces, width=2048, depth=5, precision=12, top_k=100):
+        '''
+        Initializer for the Sketch class. All counts start at zero.
+        ---
+        inputs:
+        faces:  NumPy array of faces of the game, such as Game.faces.
+        width:  Integer, the number of counters in each row of the Count-Min sketches. Defaults to 2048.
+                An estimated count is at most e / width * n_rolls above the true count, with the probability below.
+        depth:  Integer, the number of rows of the Count-Min sketches. Defaults to 5.
+                The bound on the counts holds with probability 1 - exp(-depth).
+        precision:  Integer from 4 to 18, the HyperLogLog registers are 2**precision bytes. Defaults to 12.
+                    The relative standard error of the number of distinct values is 1.04 / sqrt(2**precision).
+        top_k:  Integer, the number of heavy hitters kept. Defaults to 100.
+        outputs: none
+        '''
+        for name, value in (('width', width), ('depth', depth), ('top_k', top_k)):
+            if not isinstance(value, (int, np.integer)) or value < 1:
+                raise ValueError(f"The {name} must be a positive integer")
+        if not isinstance(precision, (int, np.integer)) or not 4 <= precision <= 18:
+            raise ValueError("The precision must be an integer from 4 to 18")
+        self.faces = faces
+        self.width = int(width)
+        self.depth = int(depth)
+        self.precision = int(precision)
+        self.top_k = int(top_k)
+        self.n_rolls = 0
+        self.__jackpots = 0
+        self.__face_totals = np.zeros(len(faces), dtype=np.int64)
+        self.__seeds = _mix64(np.arange(1, depth + 1, dtype=np.uint64) * _GOLDEN)
+        self.__sketches = {order_free: {'counts': np.zeros((self.depth, self.width), dtype=np.int64),
+                                        'registers': np.zeros(2 ** self.precision, dtype=np.uint8),
+                                        'rows': None, 'hashes': np.zeros(0, dtype=np.uint64)}
+                           for order_free in (True, False)}
+
+    def _empty(self):
+        '''
+        Returns a new Sketch with the same faces and size and no rolls.
+        '''
+        return Sketch(self.faces, self.width, self.depth, self.precision, self.top_k)
+
+    def _columns(self, hashes):
+        '''
+        Returns the column of each hash in each row of the Count-Min sketch, one row per hash function.
+        '''
+        return (_mix64(hashes[None, :] ^ self.__seeds[:, None]) % np.uint64(self.width)).astype(np.intp)
+
+    def _estimate(self, sketch, hashes):
+        '''
+        Returns the Count-Min estimate of the count of each hash, the smallest of its counters.
+        '''
+        return np.take_along_axis(sketch['counts'], self._columns(hashes), axis=1).min(axis=0)
+
+    def _keep_top(self, sketch, rows, hashes):
+        '''
+        Keeps the top_k distinct rows with the largest estimated counts among the heavy hitters and new candidate rows.
+        '''
+        if sketch['rows'] is not None:
+            rows = np.concatenate([sketch['rows'], rows])
+            hashes = np.concatenate([sketch['hashes'], hashes])
+        _, first = np.unique(hashes, return_index=True)
+        first.sort()
+        rows, hashes = rows[first], hashes[first]
+        keep = np.argsort(-self._estimate(sketch, hashes), kind='stable')[:self.top_k]
+        sketch['rows'], sketch['hashes'] = rows[keep], hashes[keep]
+
+    def _add(self, sketch, rows, counts):
+        '''
+        Adds distinct rows of face codes and their counts to one set of sketches.
+        '''
+        hashes = _row_hashes(rows)
+        columns = self._columns(hashes)
+        for i in range(self.depth):
+            sketch['counts'][i] += np.bincount(columns[i], weights=counts, minlength=self.width).astype(np.int64)
+        registers = hashes >> np.uint64(64 - self.precision)
+        rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        ranks = (64 - self.precision + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(sketch['registers'], registers.astype(np.intp), ranks)
+        top = np.argsort(-counts, kind='stable')[:self.top_k]
+        self._keep_top(sketch, rows[top], hashes[top])
+
+    def update(self, codes):
+        '''
+        Adds a chunk of rolls to the sketches. The distinct rows of the chunk are counted exactly first,
+        so the memory used grows with the chunk size but not with the number of rolls.
+        ---
+        inputs:
+        codes:  NumPy array of face codes with one row per roll and one column per die.
+        outputs: none
+        '''
+        if len(codes) == 0:
+            return
+        n_faces = len(self.faces)
+        self.__jackpots += int(np.count_nonzero(codes.min(axis=1) == codes.max(axis=1)))
+        self.__face_totals += np.bincount(codes.ravel(), minlength=n_faces)
+        for order_free in (True, False):
+            _, _, counts, rows = _unique_rows(np.sort(codes, axis=1) if order_free else codes, n_faces)
+            self._add(self.__sketches[order_free], rows, counts)
+        self.n_rolls += len(codes)
+
+    def merge(self, other):
+        '''
+        Adds the sketches of another Sketch of the same game, as if its rolls had been added to this Sketch.
+        ---
+        inputs:
+        other:  Sketch built with the same faces, width, depth, precision and top_k.
+        outputs: none
+        '''
+        if len(other.faces) != len(self.faces) or (other.faces != self.faces).any():
+            raise ValueError("Only sketches of games with the same faces can be merged")
+        if (other.width, other.depth, other.precision, other.top_k) != (self.width, self.depth, self.precision, self.top_k):
+            raise ValueError("Only sketches of the same size can be merged")
+        if other.n_rolls == 0:
+            return
+        self.__jackpots += other.count_jackpots()
+        self.__face_totals += other.__face_totals
+        for order_free in (True, False):
+            sketch, other_sketch = self.__sketches[order_free], other.__sketches[order_free]
+            sketch['counts'] += other_sketch['counts']
+            np.maximum(sketch['registers'], other_sketch['registers'], out=sketch['registers'])
+            self._keep_top(sketch, other_sketch['rows'], other_sketch['hashes'])
+        self.n_rolls += other.n_rolls
+
+    def count_jackpots(self):
+        '''
+        Returns the number of jackpots counted so far, which is exact.
+        ---
+        inputs: none
+        outputs:
+        jack_count: integer, the number of jackpots
+        '''
+        jack_count = self.__jackpots
+        return jack_count
+
+    def count_faces(self):
+        '''
+        Returns the total number of times each face was rolled, summed over every die and every roll. The totals are exact.
+        ---
+        inputs: none
+        outputs:
+        face_count: Data frame with the faces as the index and a single count column.
+        '''
+        import pandas as pd
+        face_count = pd.DataFrame({'count': self.__face_totals}, index=pd.Index(self.faces, name='face'))
+        return face_count
+
+    def _top_rows(self, order_free):
+        '''
+        Returns the heavy hitters as rows of face codes with their estimated counts, largest count first.
+        '''
+        sketch = self.__sketches[order_free]
+        if sketch['rows'] is None:
+            raise ValueError("No rolls have been counted yet")
+        counts = self._estimate(sketch, sketch['hashes'])
+        order = np.argsort(-counts, kind='stable')
+        return sketch['rows'][order], counts[order]
+
+    def count_combos(self):
+        '''
+        Returns the top_k combinations with the largest estimated counts.
+        Each count is at least the true count and, with the probability given by error_bounds, at most count_error above it.
+        ---
+        inputs: none
+        outputs:
+        combo_count_df: Dataframe with a MultiIndex of combinations and a single column for the estimated counts.
+        '''
+        combo_count_df = _label_rows(self.faces, *self._top_rows(True))
+        return combo_count_df
+
+    def count_permutations(self):
+        '''
+        Returns the top_k permutations with the largest estimated counts, with the same error bounds as count_combos.
+        ---
+        inputs: none
+        outputs:
+        perm_count_df: Dataframe with a MultiIndex of permutations and a column for the estimated counts.
+        '''
+        perm_count_df = _label_rows(self.faces, *self._permutation_rows())
+        return perm_count_df
+
+    def _permutation_rows(self):
+        '''
+        Returns the top permutations as rows of face codes with their estimated counts, largest count first.
+        '''
+        return self._top_rows(False)
+
+    def count_distinct(self, kind="permutations"):
+        '''
+        Estimates the number of distinct combinations or permutations counted so far with the HyperLogLog sketch.
+        ---
+        inputs:
+        kind:   "combos" or "permutations". Defaults to "permutations".
+        outputs:
+        n_distinct: integer, the estimated number of distinct values.
+        '''
+        if kind not in ("combos", "permutations"):
+            raise ValueError(f"{kind} is not an acceptable kind. Please enter 'combos' or 'permutations'")
+        registers = self.__sketches[kind == "combos"]['registers']
+        m = len(registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -registers.astype(int)))
+        zeros = np.count_nonzero(registers == 0)
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * np.log(m / zeros)
+        n_distinct = int(round(estimate))
+        return n_distinct
+
+    def error_bounds(self):
+        '''
+        Returns the error bounds of the estimates for the rolls counted so far.
+        ---
+        inputs: none
+        outputs:
+        bounds: python dictionary with
+                count_error: the most an estimated count can be above the true count, e / width * n_rolls,
+                count_confidence: the probability that every single estimated count is within count_error, 1 - exp(-depth),
+                distinct_error: the relative standard error of count_distinct, 1.04 / sqrt(2**precision).
+        '''
+        bounds = {'count_error': float(np.e / self.width * self.n_rolls),
+                  'count_confidence': float(1 - np.exp(-self.depth)),
+                  'distinct_error': float(1.04 / np.sqrt(2 ** self.precision))}
+        return bounds
+
+
+class PlayCache:
+    '''
+    Keeps the outcomes of seeded plays on disk, so a play that is repeated with the same dice, weights, rolls and seed
+    is loaded instead of rolled again. Outcomes are saved as .npy files of face codes.
+    When the files take more than max_bytes, the least recently used ones are deleted.
+    Files are written to a temporary file of their own and then renamed, so several processes can share a cache.
+    ---
+    Methods:
+    __init__:   Initializer. It takes the directory of the cache, its size limit and whether Analyzer summaries are kept.
+
+    get:    Returns the face codes saved for a key, or None.
+
+    put:    Saves the face codes of a play under a key.
+
+    get_summary:    Returns an Analyzer summary saved for a key as a NumPy array, or None.
+
+    put_summary:    Saves an Analyzer summary, a NumPy array of integers, under a key.
+
+    clear:  Deletes every file in the cache.
+    ---
+    Attributes:
+    directory: String, the folder the files are kept in.
+    max_bytes: Integer, the most bytes the files may take before the least recently used are deleted.
+    summaries: Boolean, whether Analyzer summaries of cached plays are kept as well.
+    '''
+    def __init__(self, directory, max_bytes=2**30, summaries=False):
+        '''
+        Initializer for the PlayCache class. The directory is created if it does not exist.
+        ---
+        inputs:
+        directory:  String or path of the folder for the cache.
+        max_bytes:  Integer, the size limit of the cache in bytes. Defaults to 1 GiB.
+        summaries:  Boolean, defaults to False. If True, Analyzer jackpot, combination and permutation counts
+                    of cached plays are saved too.
+        outputs: none
+        '''
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.summaries = summaries
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key, name=None):
+        '''
+        Returns the path of the outcome file of a key, or of one of its summaries if a name is given.
+        '''
+        return os.path.join(self.directory, key + ('.npy' if name is None else f'.{name}.npy'))
+
+    def _touch(self, path):
+        '''
+        Marks a file as just used, so it is the last to be deleted.
+        '''
+        os.utime(path)
+
+    def _write(self, path, write):
+        '''
+        Writes a file through a temporary file with a name of its own, then renames it to path in one step,
+        so writers of the same key do not clobber each other and readers never see a partial file.
+        ---
+        inputs:
+        path:   String, the path of the file.
+        write:  Function that takes an open binary file and writes the contents.
+        outputs: none
+        '''
+        handle, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                write(file)
+            os.replace(temp, path)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    def get(self, key):
+        '''
+        Returns the face codes saved under a key.
+        ---
+        inputs:
+        key: String, the key of the play from Game.
+        outputs:
+        codes: NumPy array of face codes, or None if the play is not in the cache.
+        '''
+        path = self._path(key)
+        try:
+            self._touch(path)
+            return np.load(path)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, codes):
+        '''
+        Saves the face codes of a play under a key, then deletes the least recently used files if the cache is too big.
+        ---
+        inputs:
+        key:    String, the key of the play from Game.
+        codes:  NumPy array of face codes.
+        outputs: none
+        '''
+        path = self._path(key)
+        self._write(path, lambda file: np.save(file, codes))
+        self._evict(keep=path)
+
+    def get_summary(self, key, name):
+        '''
+        Returns an Analyzer summary saved under a key. Summaries are plain arrays, so they are loaded without pickle.
+        ---
+        inputs:
+        key:    String, the key of the play from Game.
+        name:   String, the name of the Analyzer method.
+        outputs:
+        summary: NumPy array of the saved summary, or None if it is not in the cache.
+        '''
+        path = self._path(key, name)
+        try:
+            self._touch(path)
+            return np.load(path, allow_pickle=False)
+        except FileNotFoundError:
+            return None
+
+    def put_summary(self, key, name, summary):
+        '''
+        Saves an Analyzer summary under a key.
+        ---
+        inputs:
+        key:    String, the key of the play from Game.
+        name:   String, the name of the Analyzer method.
+        summary: NumPy array of integers, such as rows of face codes with their counts in the last column.
+        outputs: none
+        '''
+        path = self._path(key, name)
+        self._write(path, lambda file: np.save(file, summary, allow_pickle=False))
+        self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        '''
+        Deletes the least recently used files until the cache fits in max_bytes. The file just written is kept,
+        temporary files being written are left alone, and files another process deleted first are skipped.
+        '''
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith('.npy'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def clear(self):
+        '''
+        Deletes every file in the cache.
+        '''
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith('.npy'):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+_WORD_LISTS = {}
+
+
+class WordList:
+    '''
+    A list of words held as a hashed set, for matching the permutations of a game against a dictionary such as scrabble_words.txt.
+    Word lists read from a file are cached, so the file is only read again when it changes.
+    ---
+    Methods:
+    __init__:   Initializer. It takes any iterable of words.
+
+    from_file:  Reads a word list from a text file with one word per line, reusing the cached list when the file has not changed.
+    ---
+    Attributes:
+    words: python frozenset of the words in upper case.
+    '''
+    def __init__(self, words):
+        '''
+        Initializer for the WordList class.
+        ---
+        inputs:
+        words:  Iterable of strings. Leading and trailing whitespace and blank entries are dropped, and case is ignored.
+        outputs: none
+        '''
+        self.words = frozenset(word.strip().upper() for word in words if word.strip())
+        self.__keys = {}
+
+    @classmethod
+    def from_file(cls, path):
+        '''
+        Reads a word list from a text file with one word per line.
+        The list is cached by path, so reading the same unchanged file again returns the same WordList.
+        ---
+        inputs:
+        path:   String or path to the text file.
+        outputs:
+        word_list: WordList of the words in the file.
+        '''
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        cache_key = (path, stat.st_mtime_ns, stat.st_size)
+        if cache_key not in _WORD_LISTS:
+            with open(path) as file:
+                _WORD_LISTS[cache_key] = cls(file.read().split())
+        word_list = _WORD_LISTS[cache_key]
+        return word_list
+
+    def __contains__(self, word):
+        return word.upper() in self.words
+
+    def __len__(self):
+        return len(self.words)
+
+    def _word_keys(self, faces, dtype, n_dice):
+        '''
+        Encodes the words with one letter per die as row keys over the face codes of a game, see _row_keys.
+        Words with a letter that is not a face are left out. The keys are cached for each set of faces.
+        ---
+        inputs:
+        faces:  NumPy array of single character faces of the game.
+        dtype:  NumPy dtype of the face codes of the game.
+        n_dice: Integer, the number of dice, which is the length of the words encoded.
+        outputs:
+        keys: NumPy array with one key per word.
+        '''
+        cache_key = (tuple(faces.tolist()), np.dtype(dtype).str, n_dice)
+        if cache_key not in self.__keys:
+            words = np.array([word for word in self.words if len(word) == n_dice], dtype=f'<U{n_dice}')
+            points = words.view(np.uint32).reshape(len(words), n_dice)
+            face_points = np.array([ord(face.upper()) for face in faces.tolist()])
+            lookup = np.full(max(points.max(initial=0), face_points.max()) + 1, -1)
+            lookup[face_points] = np.arange(len(faces))
+            codes = lookup[points]
+            codes = codes[(codes >= 0).all(axis=1)].astype(dtype)
+            self.__keys[cache_key] = _row_keys(codes, len(faces))
+        return self.__keys[cache_key]
+
+
+class Profiler:
+    '''
+    Records how long each stage of a simulation takes while it is active: Die.roll_dice, Game.play, Game.show_last_play
+    and each Analyzer count. For every call it keeps the wall time, the number of rows processed, the throughput
+    and, if memory is True, the peak memory allocated by the stage as traced by tracemalloc.
+    Only one Profiler records at a time. The stages of a play in worker processes are timed as one Game.play.
+    ---
+    Methods:
+    __init__:   Initializer. It takes whether to trace memory.
+
+    enable: Starts recording. Using the Profiler in a with statement does the same until the end of the block.
+
+    disable:    Stops recording.
+
+    to_frame:   Returns a data frame with one row per recorded call.
+
+    summary:    Returns a data frame with the calls, time, rows, throughput and peak memory of each stage.
+
+    clear:  Forgets the recorded calls.
+    ---
+    Attributes:
+    memory: Boolean, whether the peak memory of each stage is traced.
+    records: python list of dictionaries with the stage, seconds, rows, rows_per_second and peak_bytes of each call, in the order the calls ended.
+    '''
+    def __init__(self, memory=False):
+        '''
+        Initializer for the Profiler class.
+        ---
+        inputs:
+        memory: Boolean, defaults to False. If True the peak allocation of each stage is traced with tracemalloc,
+                which slows the stages down while the Profiler is active.
+        outputs: none
+        '''
+        self.memory = memory
+        self.records = []
+        self.__stack = []
+        self.__previous = None
+        self.__started_tracing = False
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def enable(self):
+        '''
+        Makes this the active Profiler, so the stages called from now on are recorded.
+        ---
+        inputs: none
+        outputs: none
+        '''
+        global _PROFILER
+        if _PROFILER is self:
+            return
+        self.__previous = _PROFILER
+        _PROFILER = self
+        self.__started_tracing = self.memory and not tracemalloc.is_tracing()
+        if self.__started_tracing:
+            tracemalloc.start()
+
+    def disable(self):
+        '''
+        Stops recording and makes the Profiler that was active before enable active again.
+        ---
+        inputs: none
+        outputs: none
+        '''
+        global _PROFILER
+        if _PROFILER is not self:
+            return
+        _PROFILER = self.__previous
+        self.__previous = None
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
+
+    def _record(self, stage, rows, method, args, kwargs):
+        '''
+        Calls a method and records it as a stage.
+        The peak memory of a stage is measured from the memory in use when it starts. Stages called inside another stage,
+        such as a play inside a sweep, are recorded on their own and also count toward the stage around them.
+        ---
+        inputs:
+        stage:  String, the name of the stage.
+        rows:   Function returning the number of rows processed from the result and the arguments.
+        method: The method to call.
+        args, kwargs:   The arguments of the call.
+        outputs:
+        result: The result of the method.
+        '''
+        tracing = self.memory and tracemalloc.is_tracing()
+        frame = [0, 0]
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.__stack:
+                self.__stack[-1][1] = max(self.__stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            frame = [current, current]
+        self.__stack.append(frame)
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            self.__stack.pop()
+        peak_bytes = None
+        if tracing:
+            peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+            peak_bytes = peak - frame[0]
+            if self.__stack:
+                self.__stack[-1][1] = max(self.__stack[-1][1], peak)
+        n_rows = int(rows(result, *args, **kwargs))
+        self.records.append({'stage': stage, 'seconds': seconds, 'rows': n_rows,
+                             'rows_per_second': n_rows / seconds if seconds > 0 else float('nan'),
+                             'peak_bytes': peak_bytes})
+        return result
+
+    def to_frame(self):
+        '''
+        Returns the recorded calls as a data frame.
+        ---
+        inputs: none
+        outputs:
+        record_df: Data frame with one row per call and columns stage, seconds, rows, rows_per_second and peak_bytes.
+        '''
+        import pandas as pd
+        record_df = pd.DataFrame(self.records, columns=['stage', 'seconds', 'rows', 'rows_per_second', 'peak_bytes'])
+        return record_df
+
+    def summary(self):
+        '''
+        Sums the recorded calls of each stage.
+        ---
+        inputs: none
+        outputs:
+        summary_df: Data frame indexed by stage with the number of calls, the total seconds and rows, the rows per second
+                    over all calls and the largest peak_bytes of a call. Stages are in the order they were first recorded.
+        '''
+        record_df = self.to_frame()
+        summary_df = record_df.groupby('stage', sort=False).agg(calls=('seconds', 'size'), seconds=('seconds', 'sum'),
+                                                                rows=('rows', 'sum'), peak_bytes=('peak_bytes', 'max'))
+        summary_df.insert(3, 'rows_per_second', summary_df['rows'] / summary_df['seconds'])
+        return summary_df
+
+    def clear(self):
+        '''
+        Forgets the recorded calls.
+        ---
+        inputs: none
+        outputs: none
+        '''
+        self.records = []
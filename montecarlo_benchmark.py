@@ -0,0 +1,196 @@
+'''
+Benchmarks the hot paths of the montecarlo package: Die.roll_dice, Game.play and the Analyzer counts.
+Each case is timed (best of several repeats) and run once more under tracemalloc for its peak memory.
+Results are written to a JSON file so that runs from two releases can be compared with --compare.
+
+usage:
+python montecarlo_benchmark.py                          # full suite, writes montecarlo_benchmark_results.json
+python montecarlo_benchmark.py --quick -o new.json      # smaller sizes
+python montecarlo_benchmark.py --compare old.json new.json
+'''
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import montecarlo
+from montecarlo.montecarlo import Die
+from montecarlo.montecarlo import MarkovDie
+from montecarlo.montecarlo import Game
+from montecarlo.montecarlo import Analyzer
+
+def letter_weights():
+    '''
+    Reads the English letter frequencies shipped next to this file.
+    ---
+    inputs: none
+    outputs: numpy array of letters and numpy array of their weights
+    '''
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'english_letters.txt')
+    letters = np.array([chr(ord('A') + i) for i in range(26)])
+    weights = np.ones(26)
+    if os.path.exists(path):
+        table = pd.read_csv(path, sep=' ', header=None, names=['letter', 'weight'])
+        freq = dict(zip(table['letter'], table['weight']))
+        weights = np.array([freq.get(letter, 1) for letter in letters], dtype=float)
+    return letters, weights
+
+def make_die(kind):
+    '''
+    Makes one of the benchmark dice.
+    ---
+    inputs: kind: 'coin', 'six', 'letters', 'sticky' (a MarkovDie over the letters that repeats its last letter half the time),
+            'd1000' or 'd10000' (dice with 1000 or 10000 faces, enough for the alias sampler)
+    outputs: Die
+    '''
+    if kind == 'coin':
+        return Die(np.array(['H', 'T']))
+    if kind == 'six':
+        return Die(np.array([1, 2, 3, 4, 5, 6]))
+    if kind == 'letters':
+        letters, weights = letter_weights()
+        die = Die(letters)
+        die.set_weights(weights)
+        return die
+    if kind == 'sticky':
+        letters, weights = letter_weights()
+        transitions = np.tile(weights / weights.sum(), (26, 1)) + np.eye(26)
+        return MarkovDie(letters, transitions)
+    if kind in ('d1000', 'd10000'):
+        return Die(np.arange(int(kind[1:])))
+    raise ValueError("kind must be 'coin', 'six', 'letters', 'sticky', 'd1000' or 'd10000'.")
+
+def measure(func, repeat):
+    '''
+    Times a function and records its peak traced memory.
+    ---
+    inputs:
+    func: function taking no arguments
+    repeat: number of timed runs, the fastest is kept
+    outputs: (seconds, peak_bytes)
+    '''
+    best = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def cases(quick=False):
+    '''
+    Lists the benchmark cases.
+    ---
+    inputs: quick: bool, if True use smaller sizes
+    outputs: list of dictionaries with the name, die kind, number of dice, number of rolls and function of each case
+    '''
+    kinds = ['coin', 'six', 'letters', 'sticky', 'd1000', 'd10000']
+    n_dice = [1, 3] if quick else [1, 3, 10]
+    rolls = [10**4] if quick else [10**4, 10**6]
+    out = []
+    for kind in kinds:
+        for n in rolls:
+            die = make_die(kind)
+            out.append({'name': 'roll_dice', 'die': kind, 'dice': 1, 'rolls': n,
+                        'func': lambda die=die, n=n: die.roll_dice(n, seed=1)})
+        for d in n_dice:
+            for n in rolls:
+                game = Game([make_die(kind) for i in range(d)])
+                out.append({'name': 'play', 'die': kind, 'dice': d, 'rolls': n,
+                            'func': lambda game=game, n=n: game.play(n, seed=1)})
+        if kind not in ('coin', 'six', 'letters'):
+            continue
+        d = n_dice[-1]
+        n = rolls[-1]
+        game = Game([make_die(kind) for i in range(d)])
+        game.play(n, seed=1)
+        for method in ['count_jackpots', 'count_faces', 'count_combos', 'count_permutations']:
+            out.append({'name': 'Analyzer.' + method, 'die': kind, 'dice': d, 'rolls': n,
+                        'func': lambda game=game, method=method: getattr(Analyzer(game), method)()})
+    return out
+
+def run(quick=False, repeat=3):
+    '''
+    Runs every benchmark case.
+    ---
+    inputs:
+    quick: bool, if True use smaller sizes
+    repeat: number of timed runs per case
+    outputs: dictionary with the environment and a list of results
+    '''
+    results = []
+    for case in cases(quick):
+        seconds, peak = measure(case['func'], repeat)
+        result = {key: case[key] for key in ['name', 'die', 'dice', 'rolls']}
+        result['seconds'] = seconds
+        result['rolls_per_second'] = case['rolls'] / seconds if seconds > 0 else None
+        result['peak_bytes'] = peak
+        results.append(result)
+        print('{name:<28}{die:<9}{dice:>4} dice{rolls:>9} rolls{seconds:>11.5f} s{peak_bytes:>13} B'.format(**result))
+    return {'montecarlo': montecarlo.__version__,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'quick': quick,
+            'repeat': repeat,
+            'results': results}
+
+def compare(old, new, threshold=1.2):
+    '''
+    Compares two saved benchmark runs case by case.
+    ---
+    inputs:
+    old, new: dictionaries loaded from benchmark JSON files
+    threshold: ratio of new time to old time above which a case counts as a regression
+    outputs: pandas data frame of old and new seconds and peak bytes with their ratios and a regression column
+    '''
+    key = ['name', 'die', 'dice', 'rolls']
+    old_df = pd.DataFrame(old['results']).set_index(key)
+    new_df = pd.DataFrame(new['results']).set_index(key)
+    both = old_df[['seconds', 'peak_bytes']].join(new_df[['seconds', 'peak_bytes']], lsuffix='_old', rsuffix='_new', how='inner')
+    both['time_ratio'] = both['seconds_new'] / both['seconds_old']
+    both['memory_ratio'] = both['peak_bytes_new'] / both['peak_bytes_old']
+    both['regression'] = both['time_ratio'] > threshold
+    return both
+
+def main(argv=None):
+    '''
+    Runs the suite and saves it, or compares two saved runs.
+    ---
+    inputs: argv: list of command line arguments, defaults to sys.argv
+    outputs: exit code, 1 if --compare found a regression and 0 otherwise
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark the montecarlo package.')
+    parser.add_argument('-o', '--output', default='montecarlo_benchmark_results.json', help='JSON file to write the results to')
+    parser.add_argument('--quick', action='store_true', help='use smaller sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case, the fastest is kept')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=1.2, help='time ratio counted as a regression')
+    args = parser.parse_args(argv)
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        table = compare(old, new, args.threshold)
+        with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.max_columns', None):
+            print(table)
+        return 1 if table['regression'].any() else 0
+    report = run(args.quick, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,19 @@
 import pandas as pd
 import numpy as np
 from montecarlo.montecarlo import Die
+from montecarlo.montecarlo import MarkovDie
 from montecarlo.montecarlo import Game
 from montecarlo.montecarlo import Analyzer
+from montecarlo.montecarlo import Tally
+from montecarlo.montecarlo import Sketch
+from montecarlo.montecarlo import WordList
+from montecarlo.montecarlo import PlayCache
+from montecarlo.montecarlo import Profiler
+from montecarlo.montecarlo import spawn_generators
+import asyncio
+import subprocess
+import sys
+import tempfile
 import unittest
 
 class DieTestSuite(unittest.TestCase):
@@ -14,6 +25,10 @@ class DieTestSuite(unittest.TestCase):
     test_02_change_weight: Checks to see if the new weight is stored in the data frame with the correct side.
     test_03_roll_die: Tests if the results are a list containing faces of the die.
     test_04_get_current_state: Tests if the outcome of this method is a dataframe with a column for wieghts.
+    test_13_roll_dice_weights: Tests that a face with a weight of 0 is never rolled.
+    test_16_alias_sampler: Tests that the alias sampler follows the weights and is rebuilt after a weight change.
+    test_24_set_weights: Tests that many weights can be changed at once, from a dictionary or an array.
+    test_33_markov_die: Tests that a MarkovDie follows its transitions across chunks of a game and that its rolls can be analyzed.
     '''
     def test_01_initializer(self):
         '''
@@ -58,6 +73,66 @@ class DieTestSuite(unittest.TestCase):
         current_die = mydie.get_current_state()
         self.assertTrue(isinstance(current_die,pd.DataFrame) & (current_die.columns == 'weights'))
 
+    def test_13_roll_dice_weights(self):
+        '''
+        Tests that a face with a weight of 0 is never rolled once the weights are changed.
+        '''
+        die1 = [1,2,3]
+        die_arr = np.array(die1)
+        mydie = Die(die_arr)
+        mydie.change_weight(2, 0)
+        myroll = mydie.roll_dice(1000)
+        self.assertTrue((2 not in myroll) & (len(myroll) == 1000))
+
+    def test_16_alias_sampler(self):
+        '''
+        Tests that the alias sampler never rolls a face with a weight of 0, including after the weights change.
+        '''
+        die_arr = np.arange(100)
+        mydie = Die(die_arr, seed=5, sampler="alias")
+        mydie.change_weight(10, 0)
+        first_roll = mydie.roll_dice(5000)
+        mydie.change_weight(10, 1)
+        mydie.change_weight(20, 0)
+        second_roll = mydie.roll_dice(5000)
+        self.assertTrue((10 not in first_roll) & (20 not in second_roll) & (10 in second_roll))
+
+    def test_24_set_weights(self):
+        '''
+        Tests that many weights can be changed at once from a dictionary or an array,
+        that the current state shows the new weights, and that the rolls follow them.
+        '''
+        die_arr = np.array([1,2,3,4])
+        mydie = Die(die_arr)
+        mydie.set_weights({1: 0, 2: 0.5})
+        from_dict = mydie.get_current_state()['weights'].tolist() == [0, 0.5, 1, 1]
+        mydie.set_weights(np.array([0, 0, 0, 2.5]))
+        from_array = mydie.get_current_state().loc[4, 'weights'] == 2.5
+        self.assertTrue(from_dict & from_array & (set(mydie.roll_dice(100)) == {4}))
+
+    def test_33_markov_die(self):
+        '''
+        Tests that a MarkovDie that always moves to the next face rolls 1, 2, 3, 1, ... in every column of a game,
+        also across chunks, that the Analyzer counts its rolls, and that the game refuses to be split across workers.
+        A cycle of 12 faces checks the same for dice too large for the scan.
+        '''
+        cycle = np.array([[0, 1, 0], [0, 0, 1], [1, 0, 0]])
+        die1 = MarkovDie(np.array([1,2,3]), cycle)
+        mygame = Game([die1, die1])
+        mygame.play(50, seed=6, chunk_size=7)
+        codes, _ = mygame.show_last_codes()
+        codes = codes.astype(int)
+        follows = ((codes[1:] - codes[:-1]) % 3 == 1).all()
+        counted = Analyzer(mygame).count_permutations()['count'].sum() == 50
+        with self.assertRaises(ValueError):
+            mygame.expected_jackpot_rate()
+        with self.assertRaises(ValueError):
+            mygame.play(10, seed=2, workers=2)
+        die2 = MarkovDie(np.arange(12), np.roll(np.eye(12), 1, axis=1))
+        rolls = die2.roll_dice(30, seed=4)
+        cycles = (np.diff(rolls) % 12 == 1).all()
+        self.assertTrue(follows & counted & cycles & (die1.get_transitions().loc[3, 1] == 1))
+
 
 class GameTestSuite(unittest.TestCase):
     '''
@@ -67,6 +142,18 @@ class GameTestSuite(unittest.TestCase):
     test_05_initializer: Tests to make sure our initializer creates the attribute for the game class correctly.
     test_06_play: Tests to see if the play method correctly sampled the dice for a given number of rolls.
     test_07_show_last_play: Tests to make sure the output of the show_last_play method is a dataframe.
+    test_14_play_seed: Tests that playing with the same seed gives the same results.
+    test_15_spawn_generators: Tests that spawned generators are reproducible and independent.
+    test_17_show_last_codes: Tests that the stored face codes are compact and map back to the faces of the last play.
+    test_20_parallel_play: Tests that a play split across worker processes is reproducible for a seed and number of workers.
+    test_21_exact_distributions: Tests the exact jackpot rate and combination probabilities of a game of two coins.
+    test_26_play_cache: Tests that a repeated seeded play is loaded from the cache and a changed weight is not.
+    test_22_play_until: Tests that playing until a target precision stops early with an interval around the exact rate.
+    test_25_sweep: Tests that a sweep uses common random numbers across configurations and leaves the dice unchanged.
+    test_28_narrow_format: Tests the narrow format against one built by unstacking the wide format, and the narrow chunks.
+    test_30_mixed_dice: Tests that dice with different faces share one face table and that faces of different kinds are refused.
+    test_32_import_without_pandas: Tests that rolling dice and playing a game does not import pandas.
+    test_34_play_async: Tests that an async play matches play, reports progress, can be cancelled and can be analyzed asynchronously.
     '''
     def test_05_initializer(self):
         '''
@@ -120,6 +207,204 @@ class GameTestSuite(unittest.TestCase):
         myplay = mygame.show_last_play()
         self.assertIsInstance(myplay, pd.DataFrame)
 
+    def test_14_play_seed(self):
+        '''
+        Tests that playing with the same seed gives the same results, both for a game and a single die.
+        '''
+        dice = [1,2,3,4]
+        dice_arr = np.array(dice)
+        die1 = Die(dice_arr)
+        mygame = Game([die1, die1, die1])
+        mygame.play(50, seed=7)
+        play1 = mygame.show_last_play()
+        mygame.play(50, seed=7)
+        play2 = mygame.show_last_play()
+        same_rolls = Die(dice_arr, seed=3).roll_dice(20) == Die(dice_arr, seed=3).roll_dice(20)
+        self.assertTrue(play1.equals(play2) & same_rolls)
+
+    def test_15_spawn_generators(self):
+        '''
+        Tests that spawned generators give the same streams for the same seed and different streams from each other.
+        '''
+        first = [rng.random(5) for rng in spawn_generators(11, 3)]
+        second = [rng.random(5) for rng in spawn_generators(11, 3)]
+        reproducible = all((a == b).all() for a, b in zip(first, second))
+        independent = not (first[0] == first[1]).any()
+        self.assertTrue(reproducible & independent)
+
+    def test_17_show_last_codes(self):
+        '''
+        Tests that the face codes of the last play are stored as uint8 and map back to the faces shown by show_last_play.
+        '''
+        letters = np.array(['A','B','C'])
+        die1 = Die(letters)
+        mygame = Game([die1, die1], seed=2)
+        mygame.play(20)
+        codes, faces = mygame.show_last_codes()
+        myplay = mygame.show_last_play()
+        self.assertTrue((codes.dtype == np.uint8) & (faces[codes] == myplay.to_numpy()).all())
+
+    def test_20_parallel_play(self):
+        '''
+        Tests that a play split across 2 worker processes gives the same rolls twice for the same seed,
+        and that streaming the same parallel play counts the same permutations.
+        '''
+        dice_arr = np.array([1,2,3,4])
+        die1 = Die(dice_arr)
+        mygame = Game([die1, die1, die1])
+        mygame.play(300, seed=8, workers=2)
+        play1 = mygame.show_last_play()
+        mygame.play(300, seed=8, workers=2)
+        play2 = mygame.show_last_play()
+        perms = Analyzer(mygame).count_permutations()
+        mygame.play(300, seed=8, workers=2, stream=True, chunk_size=50)
+        stream_perms = Analyzer(mygame).count_permutations()
+        self.assertTrue(play1.equals(play2) & (len(play1) == 300) & perms.equals(stream_perms))
+
+    def test_21_exact_distributions(self):
+        '''
+        Tests the exact jackpot rate, combination probabilities and permutation probabilities of a game of two fair coins.
+        '''
+        coin = np.array(['H','T'])
+        die1 = Die(coin)
+        mygame = Game([die1, die1])
+        combos = mygame.exact_combos()['probability']
+        perms = mygame.exact_permutations()['probability']
+        exact_combos = (combos[('H','T')] == 0.5) & (combos[('H','H')] == 0.25) & (len(combos) == 3)
+        exact_perms = (perms == 0.25).all() & (len(perms) == 4)
+        self.assertTrue((mygame.expected_jackpot_rate() == 0.5) & exact_combos & exact_perms)
+
+    def test_26_play_cache(self):
+        '''
+        Tests that a repeated seeded play is loaded from the cache with the same results,
+        and that changing a weight gives a different key so the play is rolled again.
+        The Analyzer counts of the play are kept as summaries and read back from the cache without pickle.
+        '''
+        dice_arr = np.array([1,2,3])
+        die1 = Die(dice_arr)
+        mygame = Game([die1, die1])
+        with tempfile.TemporaryDirectory() as directory:
+            mycache = PlayCache(directory, summaries=True)
+            mygame.play(100, seed=5, cache=mycache)
+            play1 = mygame.show_last_play()
+            mycache.put(mygame._cache_key(100, 5, 1), np.zeros((100, 2), dtype=np.uint8))
+            mygame.play(100, seed=5, cache=mycache)
+            loaded = (mygame.show_last_play() == 1).all().all()
+            die1.change_weight(1, 2)
+            mygame.play(100, seed=5, cache=mycache)
+            rolled_again = not (mygame.show_last_play() == 1).all().all()
+            perms1 = Analyzer(mygame).count_permutations()
+            combos1 = Analyzer(mygame).count_combos()
+            jackpots1 = Analyzer(mygame).count_jackpots()
+            key = mygame._cache_key(100, 5, 1)
+            saved = mycache.get_summary(key, 'count_permutations')
+            summarized = perms1.equals(Analyzer(mygame).count_permutations()) & combos1.equals(Analyzer(mygame).count_combos())
+            summarized = summarized & (Analyzer(mygame).count_jackpots() == jackpots1) & (saved[:, -1].sum() == 100)
+        self.assertTrue(loaded & rolled_again & summarized & (len(play1) == 100))
+
+    def test_28_narrow_format(self):
+        '''
+        Tests that the narrow format matches the one built by unstacking the wide format,
+        and that the narrow chunks hold the same rows in the same order.
+        '''
+        letters = np.array(['A','B','C'])
+        die1 = Die(letters)
+        mygame = Game([die1, die1, die1], seed=14)
+        mygame.play(25)
+        wide = mygame.show_last_play()
+        expected = pd.DataFrame(wide.unstack())
+        expected.index = expected.index.reorder_levels(order=[1, 0])
+        expected.index.names = ['roll_number', 'die_number']
+        chunks = list(mygame.iter_narrow(chunk_size=10))
+        exported = pd.DataFrame({key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]})
+        exported = exported.set_index(['roll_number', 'die_number']).rename(columns={'face': 0})
+        self.assertTrue(mygame.show_last_play('narrow').equals(expected) & (len(chunks) == 9) & exported.equals(expected))
+
+    def test_22_play_until(self):
+        '''
+        Tests that playing until the jackpot rate of two coins is known to within 0.05 stops before max_rolls,
+        meets the target, and keeps the rolls it used for the Analyzer. A batch size or max_rolls of 0 is refused.
+        '''
+        coin = np.array(['H','T'])
+        die1 = Die(coin)
+        mygame = Game([die1, die1])
+        result = mygame.play_until(ci_width=0.05, batch_size=500, max_rolls=100000, seed=4)
+        myanalyzer = Analyzer(mygame)
+        stopped = result['converged'] & (result['rolls'] < 100000) & (result['ci_high'] - result['ci_low'] <= 0.05)
+        with self.assertRaises(ValueError):
+            mygame.play_until(ci_width=0.05, batch_size=0)
+        with self.assertRaises(ValueError):
+            mygame.play_until(ci_width=0.05, max_rolls=0)
+        self.assertTrue(stopped & (myanalyzer.count_jackpots() == round(result['estimate'] * result['rolls'])))
+
+    def test_25_sweep(self):
+        '''
+        Tests that two equal configurations in a sweep give the same jackpots because they share their random draws,
+        that a die fixed on one face always gives jackpots, and that the weights of the dice are not changed.
+        '''
+        dice_arr = np.array([1,2,3])
+        die1 = Die(dice_arr)
+        mygame = Game([die1, die1])
+        mysweep = mygame.sweep([[1, 1, 1], {3: 5}, [1, 1, 1], [0, 0, 1]], 1000, seed=6)
+        common = mysweep.loc[0, 'jackpots'] == mysweep.loc[2, 'jackpots']
+        fixed = mysweep.loc[3, 'jackpot_rate'] == 1
+        unchanged = (die1.get_current_state()['weights'] == 1).all()
+        self.assertTrue(common & fixed & unchanged & (mysweep.index.name == 'config'))
+
+    def test_30_mixed_dice(self):
+        '''
+        Tests that dice with different faces are mapped into one face table that the counts use,
+        and that games of dice with integer and string faces, or integer and float faces, are refused.
+        '''
+        die1 = Die(np.array(['A','B']))
+        die2 = Die(np.array(['B','C','D']))
+        mygame = Game([die1, die2])
+        mygame.play(200, seed=5)
+        codes = mygame.show_face_codes()
+        mapped = (codes[0].tolist() == [0, 1]) & (codes[1].tolist() == [1, 2, 3])
+        perms = Analyzer(mygame).count_permutations().index
+        valid = set(perms.get_level_values(0)) <= {'A','B'} and set(perms.get_level_values(1)) <= {'B','C','D'}
+        with self.assertRaises(ValueError):
+            Game([die1, Die(np.array([1,2,3]))])
+        with self.assertRaises(ValueError):
+            Game([Die(np.array([1,2])), Die(np.array([1.5,2.5]))])
+        self.assertTrue(mapped & valid & (mygame.faces.tolist() == ['A','B','C','D']))
+
+    def test_32_import_without_pandas(self):
+        '''
+        Tests in a new python process that importing the package, rolling a die and playing a game does not import pandas,
+        and that pandas is imported once a data frame is asked for.
+        '''
+        script = ("import sys, numpy as np, montecarlo; die1 = montecarlo.Die(np.array([1,2,3])); die1.roll_dice(5); "
+                  "mygame = montecarlo.Game([die1, die1]); mygame.play(10, seed=1); before = 'pandas' in sys.modules; "
+                  "mygame.show_last_play(); print(before, 'pandas' in sys.modules)")
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split(), ['False', 'True'])
+
+    def test_34_play_async(self):
+        '''
+        Tests that play_async gives the same rolls as play for a seed and reports its progress after every chunk,
+        that a cancelled play leaves the last play unchanged, and that count_async gives the same counts as count_combos.
+        '''
+        die1 = Die(np.array([1,2,3,4,5,6]))
+        mygame = Game([die1, die1])
+        mygame.play(1000, seed=12)
+        expected = mygame.show_last_codes()[0].copy()
+        async def run():
+            steps = []
+            await mygame.play_async(1000, seed=12, chunk_size=300, progress=lambda done, total: steps.append(done))
+            same = (mygame.show_last_codes()[0] == expected).all() & (steps == [300, 600, 900, 1000])
+            async def cancel(done, total):
+                task.cancel()
+            task = asyncio.ensure_future(mygame.play_async(10000, chunk_size=100, progress=cancel, limit=asyncio.Semaphore(1)))
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            unchanged = (mygame.show_last_codes()[0] == expected).all()
+            myanalyzer = Analyzer(mygame)
+            combos = await myanalyzer.count_async("count_combos")
+            return same & unchanged & combos.equals(myanalyzer.count_combos())
+        self.assertTrue(asyncio.run(run()))
+
 
 class AnalyzerTestSuite(unittest.TestCase):
     '''
@@ -131,6 +416,12 @@ class AnalyzerTestSuite(unittest.TestCase):
     test_10_count_faces: Tests if the count_faces method correctly counts the number of faces.
     test_11_count_combos: Tests to see if the output of the count_combos method is a dataframe with a MultiIndex.
     test_12_count_permutations: Tests the the output of the count_permutations method is a dataframe with a MultiIndex.
+    test_18_count_values: Tests the counts of combinations, permutations and jackpots against counts made row by row.
+    test_19_streamed_play: Tests that a streamed play gives the same counts as a normal play with the same seed.
+    test_23_count_words: Tests that count_words keeps exactly the permutations that are words.
+    test_27_memory_mapped_play: Tests that a play written to a file gives the same counts when the file is analyzed.
+    test_29_profiler: Tests that a Profiler records each stage once with its rows and peak memory, and nothing once disabled.
+    test_31_sketch: Tests that sketched counts are within their error bounds and that a streamed Sketch matches Analyzer.sketch.
 
     
     '''
@@ -232,6 +523,131 @@ class AnalyzerTestSuite(unittest.TestCase):
         mypermutations = myanalyzer.count_permutations()
         self.assertTrue((mypermutations.index.nlevels > 1) & isinstance(mypermutations, pd.DataFrame))
 
+    def test_18_count_values(self):
+        '''
+        Tests the counts of combinations, permutations and jackpots against counts made row by row from the data of the last play.
+        '''
+        dice_arr = np.array([1,2,3])
+        die1 = Die(dice_arr)
+        mygame = Game([die1, die1, die1], seed=9)
+        mygame.play(200)
+        myanalyzer = Analyzer(mygame)
+        rows = [tuple(row) for row in myanalyzer.data.to_numpy().tolist()]
+        combos = {}
+        perms = {}
+        for row in rows:
+            combos[tuple(sorted(row))] = combos.get(tuple(sorted(row)), 0) + 1
+            perms[row] = perms.get(row, 0) + 1
+        jackpots = sum(len(set(row)) == 1 for row in rows)
+        mycombos = myanalyzer.count_combos()['count'].to_dict()
+        mypermutations = myanalyzer.count_permutations()['count'].to_dict()
+        self.assertTrue((mycombos == combos) & (mypermutations == perms) & (myanalyzer.count_jackpots() == jackpots))
+
+    def test_19_streamed_play(self):
+        '''
+        Tests that a play streamed in small chunks gives the same counts as a normal play with the same seed,
+        and that the Tally of the streamed play counts every face rolled. A play of 0 rolls gives the same empty counts either way.
+        '''
+        dice_arr = np.array([1,2,3,4])
+        die1 = Die(dice_arr)
+        mygame = Game([die1, die1, die1])
+        mygame.play(500, seed=21)
+        myanalyzer = Analyzer(mygame)
+        streamgame = Game([die1, die1, die1])
+        streamgame.play(500, seed=21, chunk_size=64, stream=True)
+        streamanalyzer = Analyzer(streamgame)
+        mytally = streamgame.show_last_tally()
+        same_counts = (myanalyzer.count_jackpots() == streamanalyzer.count_jackpots()) & \
+            myanalyzer.count_combos().equals(streamanalyzer.count_combos()) & \
+            myanalyzer.count_permutations().equals(streamanalyzer.count_permutations())
+        mygame.play(0)
+        streamgame.play(0, stream=True)
+        same_empty = Analyzer(mygame).count_combos().equals(Analyzer(streamgame).count_combos()) & \
+            Analyzer(mygame).count_permutations().equals(Analyzer(streamgame).count_permutations())
+        self.assertTrue(same_counts & same_empty & isinstance(mytally, Tally) & (mytally.count_faces()['count'].sum() == 1500))
+
+    def test_23_count_words(self):
+        '''
+        Tests that count_words keeps exactly the permutations that spell a word, comparing with a check of each permutation.
+        '''
+        letters = np.array(['A','E','N','T'])
+        die1 = Die(letters)
+        mygame = Game([die1, die1, die1], seed=12)
+        mygame.play(300)
+        myanalyzer = Analyzer(mygame)
+        mywords = WordList(['ant', 'tan', 'net', 'ten', 'tea', 'eat', 'ate', 'at', 'neat'])
+        word_counts = myanalyzer.count_words(mywords)
+        perms = myanalyzer.count_permutations()
+        expected = perms[[''.join(perm).lower() in ['ant','tan','net','ten','tea','eat','ate'] for perm in perms.index]]
+        self.assertTrue(word_counts.equals(expected))
+
+    def test_27_memory_mapped_play(self):
+        '''
+        Tests that a play written to a memory mapped file gives the same counts when the path of the file
+        is given to the Analyzer as the same play kept in memory, and that pickled faces are only loaded on request.
+        '''
+        letters = np.array(['A','B','C'])
+        die1 = Die(letters)
+        mygame = Game([die1, die1, die1])
+        mygame.play(400, seed=13)
+        myanalyzer = Analyzer(mygame)
+        with tempfile.TemporaryDirectory() as directory:
+            path = directory + '/plays.npy'
+            mygame.play(400, seed=13, out=path, chunk_size=150)
+            fileanalyzer = Analyzer(path)
+            same_counts = (myanalyzer.count_jackpots() == fileanalyzer.count_jackpots()) & \
+                myanalyzer.count_faces().equals(fileanalyzer.count_faces()) & \
+                myanalyzer.count_permutations().equals(fileanalyzer.count_permutations())
+            del fileanalyzer
+            objectgame = Game([Die(np.array(['A','B'], dtype=object))])
+            objectgame.play(10, seed=13, out=directory + '/objects.npy')
+            with self.assertRaises(ValueError):
+                Analyzer(directory + '/objects.npy')
+            pickled = Analyzer(directory + '/objects.npy', allow_pickle=True).count_jackpots() == 10
+        self.assertTrue(same_counts & pickled)
+
+    def test_29_profiler(self):
+        '''
+        Tests that a Profiler records the play, the Analyzer counts and the rows of each, with one call for each stage,
+        and that nothing is recorded after it is disabled.
+        '''
+        die1 = Die(np.array([1,2,3,4,5,6]))
+        mygame = Game([die1, die1])
+        with Profiler(memory=True) as profiler:
+            mygame.play(500, seed=3)
+            myanalyzer = Analyzer(mygame)
+            myanalyzer.count_jackpots()
+            myanalyzer.count_combos()
+            myanalyzer.count_words(WordList(['12', '66']))
+            myanalyzer.sketch(top_k=5)
+        mygame.play(10)
+        summary = profiler.summary()
+        stages = summary.index.tolist() == ['Game.play', 'Analyzer.count_jackpots', 'Analyzer.count_combos',
+                                            'Analyzer.count_words', 'Analyzer.sketch']
+        self.assertTrue(stages & (summary['rows'] == 500).all() & (summary['calls'] == 1).all() & (summary['peak_bytes'] > 0).all())
+
+    def test_31_sketch(self):
+        '''
+        Tests that the estimated counts of the top permutations are never below the true counts and at most
+        count_error above them, that the number of distinct permutations is estimated closely,
+        and that a play streamed into a Sketch gives the same sketch as Analyzer.sketch.
+        '''
+        die1 = Die(np.array([1,2,3,4,5,6]))
+        die1.change_weight(6, 5)
+        mygame = Game([die1, die1, die1])
+        mygame.play(5000, seed=8)
+        myanalyzer = Analyzer(mygame)
+        exact = myanalyzer.count_permutations()
+        sketch = myanalyzer.sketch(width=256, top_k=10)
+        approx = sketch.count_permutations()
+        error = approx['count'] - exact.loc[approx.index, 'count']
+        bounded = (error >= 0).all() & (error <= sketch.error_bounds()['count_error']).all()
+        distinct = abs(sketch.count_distinct() - len(exact)) <= 0.1 * len(exact)
+        streamed = Sketch(mygame.faces, width=256, top_k=10)
+        mygame.play(5000, seed=8, sketch=streamed)
+        same = Analyzer(mygame).count_permutations().equals(approx)
+        self.assertTrue(bounded & distinct & same & (len(approx) == 10) & (approx.index[0] == (6, 6, 6)))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file